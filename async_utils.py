@@ -0,0 +1,130 @@
+# async_utils.py
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+
+class BlockingExecutor:
+    """
+    A bounded thread pool for blocking calls (like gTTS) that must not run on
+    the event loop. Tracks how long calls wait for a worker and how long they run.
+    """
+
+    def __init__(self, max_workers=4, name="blocking"):
+        self.name = name
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self.calls = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.total_wait = 0.0
+        self.total_run = 0.0
+        self.max_run = 0.0
+
+    async def run(self, fn, *args, timeout=None):
+        """
+        Runs fn(*args) on the pool. `timeout` counts from when a worker starts
+        the call, so time spent waiting for a free worker does not count
+        against it. A call that times out keeps running to completion; only
+        the caller stops waiting for it.
+        """
+        loop = asyncio.get_running_loop()
+        submitted = time.perf_counter()
+        started = None
+        running = asyncio.Event()
+
+        def call():
+            nonlocal started
+            started = time.perf_counter()
+            loop.call_soon_threadsafe(running.set)
+            return fn(*args)
+
+        def finished(future):
+            self.in_flight -= 1
+            if not future.cancelled() and future.exception() is not None:
+                self.errors += 1
+            if started is not None:
+                run_time = time.perf_counter() - started
+                self.total_wait += started - submitted
+                self.total_run += run_time
+                self.max_run = max(self.max_run, run_time)
+
+        self.calls += 1
+        self.in_flight += 1
+        future = loop.run_in_executor(self._pool, call)
+        future.add_done_callback(finished)
+        if timeout is None:
+            return await future
+
+        # Wait (without a deadline) for a worker to pick the call up
+        picked_up = asyncio.ensure_future(running.wait())
+        try:
+            await asyncio.wait({future, picked_up}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            picked_up.cancel()
+        remaining = timeout - (time.perf_counter() - started) if started is not None else timeout
+        return await asyncio.wait_for(asyncio.shield(future), max(0.0, remaining))
+
+    def stats(self):
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'in_flight': self.in_flight,
+            'avg_wait_ms': (self.total_wait / self.calls * 1000) if self.calls else 0.0,
+            'avg_run_ms': (self.total_run / self.calls * 1000) if self.calls else 0.0,
+            'max_run_ms': self.max_run * 1000,
+        }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
+
+
+class LoopLagMonitor:
+    """
+    Measures how long the event loop is blocked by sleeping for a fixed
+    interval and recording how late each wake-up is.
+    """
+
+    def __init__(self, interval=0.1, warn_threshold=0.25):
+        self.interval = interval
+        self.warn_threshold = warn_threshold
+        self.samples = 0
+        self.total_lag = 0.0
+        self.max_lag = 0.0
+        self.last_lag = 0.0
+        self.stalls = 0
+        self._task = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+
+    async def _run(self):
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - expected)
+            self.samples += 1
+            self.total_lag += lag
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            metrics.LOOP_LAG.observe(lag)
+            if lag >= self.warn_threshold:
+                self.stalls += 1
+                logging.warning(f"Event loop was blocked for {lag * 1000:.0f}ms")
+
+    def stats(self):
+        return {
+            'samples': self.samples,
+            'avg_lag_ms': (self.total_lag / self.samples * 1000) if self.samples else 0.0,
+            'max_lag_ms': self.max_lag * 1000,
+            'last_lag_ms': self.last_lag * 1000,
+            'stalls': self.stalls,
+        }
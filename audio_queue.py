@@ -0,0 +1,217 @@
+# audio_queue.py
+import asyncio
+import logging
+import time
+from collections import deque
+
+import discord
+
+import metrics
+
+# How much audio to decode ahead of time for the next item, in 20ms frames.
+PREFETCH_FRAMES = 10
+
+
+class BufferedSource(discord.AudioSource):
+    """
+    Wraps an AudioSource and lets the first few frames be read ahead of time,
+    so playback starts from memory instead of waiting on a cold decoder.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self._frames = deque()
+        # Called from the player thread when the first frame goes out
+        self.on_start = None
+
+    def prime(self, frames=PREFETCH_FRAMES):
+        # Blocking: runs in an executor while the previous item is playing.
+        for _ in range(frames):
+            frame = self.source.read()
+            if not frame:
+                break
+            self._frames.append(frame)
+
+    def read(self):
+        if self.on_start is not None:
+            on_start, self.on_start = self.on_start, None
+            on_start()
+        if self._frames:
+            return self._frames.popleft()
+        return self.source.read()
+
+    def is_opus(self):
+        return self.source.is_opus()
+
+    def cleanup(self):
+        self._frames.clear()
+        self.source.cleanup()
+
+
+class QueueItem:
+    """
+    A single clip waiting to be played. `loader` is an async callable that
+    returns a discord.AudioSource; it is only called once, when the item is
+    prefetched or about to be played. `requested_at` is the perf_counter()
+    time of the command that queued it, used to time its first audio packet.
+    """
+
+    def __init__(self, title, loader, requested_at=None):
+        self.title = title
+        self.loader = loader
+        self.requested_at = requested_at
+        self._task = None
+
+    def prefetch(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._load())
+        return self._task
+
+    async def _load(self):
+        source = BufferedSource(await self.loader())
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, source.prime)
+        return source
+
+    def discard(self):
+        if self._task is None:
+            return
+        if not self._task.done():
+            self._task.cancel()
+        elif not self._task.cancelled() and self._task.exception() is None:
+            self._task.result().cleanup()
+
+
+class GuildAudioQueue:
+    """
+    Plays queued clips one after another in a single guild. While a clip is
+    playing, the next one is loaded and primed so the gap between clips is
+    close to zero.
+    """
+
+    def __init__(self, guild, max_size=50):
+        self.guild = guild
+        self.max_size = max_size
+        self.current = None
+        self._items = deque()
+        self._player = None
+        self._wakeup = asyncio.Event()
+
+    def enqueue(self, item):
+        """
+        Adds an item to the queue and returns its position, where 0 means it
+        starts right away. Raises asyncio.QueueFull when the queue is full.
+        """
+        return self.enqueue_many([item])
+
+    def enqueue_many(self, items):
+        """
+        Adds several items back to back, so nothing queued concurrently can
+        land between them. Returns the position of the first item. Either
+        all items are queued or, if they do not fit, none are.
+        """
+        if len(self._items) + len(items) > self.max_size:
+            raise asyncio.QueueFull()
+        position = len(self._items) + (1 if self.current else 0)
+        was_empty = not self._items
+        self._items.extend(items)
+        if was_empty:
+            # Either it starts right away or it is next after the clip playing now;
+            # _play() only prefetches the head when a clip starts, so load it here
+            items[0].prefetch()
+        self._wakeup.set()
+        if self._player is None or self._player.done():
+            self._player = asyncio.create_task(self._run())
+        return position
+
+    def skip(self):
+        voice_client = self.guild.voice_client
+        if voice_client and (voice_client.is_playing() or voice_client.is_paused()):
+            voice_client.stop()
+            return True
+        return False
+
+    def clear(self):
+        count = len(self._items)
+        while self._items:
+            self._items.popleft().discard()
+        return count
+
+    def is_active(self):
+        return self.current is not None or bool(self._items)
+
+    def list(self):
+        titles = [item.title for item in self._items]
+        if self.current:
+            titles.insert(0, self.current.title)
+        return titles
+
+    async def _run(self):
+        while True:
+            if not self._items:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=60)
+                except asyncio.TimeoutError:
+                    return
+                continue
+
+            item = self._items.popleft()
+            self.current = item
+            try:
+                await self._play(item)
+            except Exception as e:
+                logging.error(f"Queue playback error in guild {self.guild.id}: {e}")
+            finally:
+                self.current = None
+
+    async def _play(self, item):
+        source = await item.prefetch()
+        voice_client = self.guild.voice_client
+        if voice_client is None or not voice_client.is_connected():
+            source.cleanup()
+            return
+
+        loop = asyncio.get_running_loop()
+        finished = asyncio.Event()
+
+        def after(error):
+            if error:
+                logging.error(f"Playback error: {error}")
+            loop.call_soon_threadsafe(finished.set)
+
+        def on_start():
+            metrics.PLAYS.inc(guild=self.guild.id)
+            if item.requested_at is not None:
+                metrics.observe_stage('first_audio', time.perf_counter() - item.requested_at)
+
+        source.on_start = on_start
+        if voice_client.is_playing():
+            voice_client.stop()
+        voice_client.play(source, after=after)
+
+        # Get the next clip ready while this one is playing.
+        if self._items:
+            self._items[0].prefetch()
+        await finished.wait()
+
+
+class AudioQueueManager:
+    """
+    Hands out one GuildAudioQueue per guild.
+    """
+
+    def __init__(self, max_size=50):
+        self.max_size = max_size
+        self._queues = {}
+
+    def get(self, guild):
+        queue = self._queues.get(guild.id)
+        if queue is None:
+            queue = GuildAudioQueue(guild, max_size=self.max_size)
+            self._queues[guild.id] = queue
+        return queue
+
+    def is_active(self, guild):
+        queue = self._queues.get(guild.id)
+        return queue is not None and queue.is_active()
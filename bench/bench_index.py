@@ -0,0 +1,83 @@
+# bench_index.py
+"""
+Measures how fast the sound index answers autocomplete queries.
+
+    python bench/bench_index.py [--sounds 10000] [--runs 200]
+
+Fills a SoundIndex with --sounds synthetic titles built from the words in the
+fixture pages' sound titles, then reports mean/p50/p99 search time for short
+prefixes, whole words and multi-word queries. Autocomplete has to answer
+within Discord's 3 second window, and ideally in a few milliseconds.
+"""
+import argparse
+import glob
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from scrape import parse_search_results  # noqa: E402
+from sound_index import SoundIndex, normalize  # noqa: E402
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def fixture_words():
+    words = set()
+    for path in glob.glob(os.path.join(FIXTURE_DIR, '*.html')):
+        with open(path, encoding='utf-8') as f:
+            for sound in parse_search_results(f.read(), num_results=1000):
+                words.update(normalize(sound['title']).split())
+    return sorted(words)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sounds', type=int, default=10000, help="Synthetic sounds to index")
+    parser.add_argument('--runs', type=int, default=200, help="Searches per query kind")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    words = fixture_words()
+    index = SoundIndex(max_entries=args.sounds)
+    started = time.perf_counter()
+    for i in range(args.sounds):
+        title = ' '.join(rng.choices(words, k=rng.randint(1, 4))).title()
+        index.add_myinstants(title, f"https://www.myinstants.com/media/sounds/bench-{i}.mp3")
+    build = time.perf_counter() - started
+    print(f"Indexed {len(index)} sounds ({len(words)} distinct words) in {build * 1000:.0f}ms\n")
+
+    kinds = {
+        'empty': lambda: '',
+        '1 letter': lambda: rng.choice(words)[:1],
+        '3 letters': lambda: rng.choice(words)[:3],
+        'word': lambda: rng.choice(words),
+        '2 prefixes': lambda: f"{rng.choice(words)[:2]} {rng.choice(words)[:3]}",
+        'no match': lambda: 'zzqx',
+    }
+    print(f"{'query':<11} {'mean ms':>9} {'p50 ms':>9} {'p99 ms':>9} {'results':>8}")
+    for name, make_query in kinds.items():
+        timings = []
+        results = []
+        for _ in range(args.runs):
+            query = make_query()
+            start = time.perf_counter()
+            found = index.search(query)
+            timings.append((time.perf_counter() - start) * 1000)
+            results.append(len(found))
+        print(f"{name:<11} {statistics.mean(timings):>9.3f} {percentile(timings, 50):>9.3f} "
+              f"{percentile(timings, 99):>9.3f} {statistics.mean(results):>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
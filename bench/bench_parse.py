@@ -0,0 +1,76 @@
+# bench_parse.py
+"""
+Compares the search page parsers in scrape.py on saved fixture pages.
+
+    python bench/bench_parse.py [--runs 50] [--results 3] [fixture.html ...]
+
+For every fixture and parser mode it reports the mean/p50/p99 parse time and
+the peak memory allocated during one parse (via tracemalloc). All modes are
+checked to return the same sounds before timing starts.
+"""
+import argparse
+import glob
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from scrape import parse_search_results, STRAINER_BACKEND  # noqa: E402
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+MODES = ['full', 'strainer', 'stream']
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def bench_mode(html, mode, num_results, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        parse_search_results(html, num_results, parser=mode)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    parse_search_results(html, num_results, parser=mode)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return timings, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('fixtures', nargs='*', help="HTML files to parse (defaults to bench/fixtures/*.html)")
+    parser.add_argument('--runs', type=int, default=50)
+    parser.add_argument('--results', type=int, default=3, help="num_results passed to the parser")
+    args = parser.parse_args()
+
+    fixtures = args.fixtures or sorted(glob.glob(os.path.join(FIXTURE_DIR, '*.html')))
+    print(f"strainer backend: {STRAINER_BACKEND}, runs: {args.runs}, num_results: {args.results}\n")
+    print(f"{'fixture':<28} {'mode':<9} {'mean ms':>8} {'p50 ms':>8} {'p99 ms':>8} {'peak KiB':>9}")
+
+    for path in fixtures:
+        with open(path, encoding='utf-8') as f:
+            html = f.read()
+
+        expected = parse_search_results(html, args.results, parser='full')
+        for mode in MODES:
+            got = parse_search_results(html, args.results, parser=mode)
+            if got != expected:
+                print(f"{os.path.basename(path)}: '{mode}' returned {got}, expected {expected}")
+                sys.exit(1)
+
+        for mode in MODES:
+            timings, peak = bench_mode(html, mode, args.results, args.runs)
+            print(f"{os.path.basename(path):<28} {mode:<9} {statistics.mean(timings):>8.2f} "
+                  f"{percentile(timings, 50):>8.2f} {percentile(timings, 99):>8.2f} {peak / 1024:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
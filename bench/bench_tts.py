@@ -0,0 +1,87 @@
+# bench_tts.py
+"""
+Compares the TTS engines in tts_engines.py on latency and throughput.
+
+    python bench/bench_tts.py [--engines gtts espeak] [--concurrency 4] [--rounds 2]
+
+For each available engine it synthesizes a fixed set of phrases one at a time
+(latency: mean/p50/p99 per phrase) and then all at once on a thread pool of
+--concurrency workers (throughput: phrases per second, audio bytes produced).
+Nothing is cached, so every call hits the engine. gTTS needs network access.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from tts_engines import ENGINES  # noqa: E402
+
+PHRASES = [
+    "नमस्ते",
+    "क्या हाल है भाई",
+    "आज मौसम बहुत अच्छा है",
+    "मैं अभी खाना खा रहा हूँ, बाद में बात करते हैं।",
+    "यह एक लंबा वाक्य है जो यह जांचने के लिए है कि लंबे संदेशों को बनाने में कितना समय लगता है।",
+    "hello from hindibot",
+]
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def timed_synthesize(engine, text, lang):
+    start = time.perf_counter()
+    data = engine.synthesize(text, lang)
+    return (time.perf_counter() - start) * 1000, len(data)
+
+
+def bench_engine(engine, lang, rounds, concurrency):
+    latencies = []
+    for _ in range(rounds):
+        for text in PHRASES:
+            elapsed, _ = timed_synthesize(engine, text, lang)
+            latencies.append(elapsed)
+
+    jobs = PHRASES * rounds
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda text: timed_synthesize(engine, text, lang), jobs))
+    wall = time.perf_counter() - start
+    total_bytes = sum(size for _, size in results)
+    return latencies, len(jobs) / wall, total_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--engines', nargs='*', default=list(ENGINES), help="Engines to compare")
+    parser.add_argument('--lang', default='hi')
+    parser.add_argument('--rounds', type=int, default=2, help="Passes over the phrase list")
+    parser.add_argument('--concurrency', type=int, default=4, help="Workers for the throughput run")
+    args = parser.parse_args()
+
+    print(f"{len(PHRASES)} phrases x {args.rounds} rounds, throughput with {args.concurrency} workers\n")
+    print(f"{'engine':<8} {'mean ms':>9} {'p50 ms':>9} {'p99 ms':>9} {'phrases/s':>10} {'KiB out':>9}")
+
+    for name in args.engines:
+        engine = ENGINES.get(name)
+        if engine is None or not engine.available():
+            print(f"{name:<8} not available, skipped")
+            continue
+        try:
+            latencies, throughput, total_bytes = bench_engine(engine, args.lang, args.rounds, args.concurrency)
+        except Exception as e:
+            print(f"{name:<8} failed: {e}")
+            continue
+        print(f"{name:<8} {statistics.mean(latencies):>9.1f} {percentile(latencies, 50):>9.1f} "
+              f"{percentile(latencies, 99):>9.1f} {throughput:>10.2f} {total_bytes / 1024:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
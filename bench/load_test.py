@@ -0,0 +1,544 @@
+# load_test.py
+"""
+Drives the bot's command handlers under load, with local stand-ins for
+Discord, gTTS and myinstants.
+
+    python bench/load_test.py [--guilds 20] [--ops 10] [--mix hin=4,namit=1,special=1,search=2,indexed=1]
+
+Every simulated guild has one user who runs --ops commands back to back,
+waiting for the previous clip to finish before the next one. All guilds run
+at the same time. Nothing leaves the machine:
+
+  * Interactions, voice channels and voice clients are fakes that record when
+    the bot replies and when the first audio frame is read.
+  * myinstants is an aiohttp server on localhost that serves the HTML pages in
+    bench/fixtures/ and the bundled MP3s for every sound; scrape.BASE_URL is
+    pointed at it.
+  * gTTS is replaced by a stub engine that sleeps --tts-latency and returns
+    a bundled MP3.
+  * Unless --real-ffmpeg is given, FFmpeg sources are replaced by a stub that
+    reads its input and yields silent frames, so the numbers measure the bot
+    and not the encoder.
+
+For each operation it reports p50/p99 of the time until the bot replied and
+the time until the first audio frame was played, plus overall throughput.
+Caches start empty in a temporary directory.
+"""
+import argparse
+import asyncio
+import datetime
+import itertools
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import types
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+sys.path.insert(0, ROOT)
+
+PHRASES = [
+    "नमस्ते",
+    "क्या हाल है भाई",
+    "आज मौसम बहुत अच्छा है",
+    "मैं अभी खाना खा रहा हूँ, बाद में बात करते हैं।",
+    "यह एक लंबा वाक्य है जो यह जांचने के लिए है कि लंबे संदेशों को बनाने में कितना समय लगता है। "
+    "इसके बाद एक और वाक्य आता है ताकि संदेश कई हिस्सों में बंट जाए।",
+    "hello from hindibot",
+]
+QUERIES = ["vine boom", "bruh", "rare"]
+SPECIALS = ["mew", "gyatt", "humi", "mcstan", "babloo"]
+USER_ID = 424242424242424242
+FRAME = b'\x00' * 3840  # one 20ms frame of 48kHz stereo PCM
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+# --- Environment ---
+# bot.py reads its configuration at import time, so this has to run first.
+def prepare_environment(args):
+    workdir = tempfile.mkdtemp(prefix='hindibot-bench-')
+    os.environ.setdefault('DISTOKEN', 'bench-token')
+    os.environ['AUTHORIZED_USER_ID'] = str(USER_ID)
+    os.environ['TTS_CACHE_DIR'] = os.path.join(workdir, 'tts_cache')
+    os.environ['MP3_STORE_DIR'] = os.path.join(workdir, 'store')
+    os.environ['OPUS_STORE_DIR'] = os.path.join(workdir, 'opus')
+    os.environ['SOUND_INDEX_FILE'] = os.path.join(workdir, 'index.json')
+    os.environ['GUILD_SETTINGS_FILE'] = os.path.join(workdir, 'guild_settings.json')
+    os.environ['TTS_ENGINE'] = 'gtts'
+    os.environ['TTS_FALLBACK_ENGINE'] = ''
+    os.environ['SEARCH_STREAM_PLAYBACK'] = '1' if args.stream else '0'
+    return workdir
+
+
+# --- gTTS stand-in ---
+def install_stub_tts(latency, audio):
+    import tts_engines
+
+    class StubTTSEngine(tts_engines.GTTSEngine):
+        """
+        Answers like gTTS after a fixed delay, without the network.
+        """
+
+        def synthesize(self, text, lang):
+            time.sleep(latency)
+            return audio
+
+    tts_engines.register_engine(StubTTSEngine())
+
+
+# --- FFmpeg stand-in ---
+class StubFFmpegSource:
+    """
+    Takes the same arguments as the discord.py FFmpeg sources. Reads its whole
+    input on the first read() (on the player thread, like FFmpeg's pipe
+    writer would) and then yields one silent frame per `bytes_per_frame`.
+    """
+
+    def __init__(self, source, *, pipe=False, codec=None, max_frames=50, bytes_per_frame=320, **kwargs):
+        self._source = source
+        self._pipe = pipe
+        self._max_frames = max_frames
+        self._bytes_per_frame = bytes_per_frame
+        self._remaining = None
+
+    def read(self):
+        if self._remaining is None:
+            if self._pipe:
+                data = self._source.read()
+            else:
+                with open(self._source, 'rb') as f:
+                    data = f.read()
+            self._remaining = min(self._max_frames, max(1, len(data) // self._bytes_per_frame))
+        if self._remaining <= 0:
+            return b''
+        self._remaining -= 1
+        return FRAME
+
+    def is_opus(self):
+        return False
+
+    def cleanup(self):
+        pass
+
+
+def install_stub_ffmpeg(max_frames):
+    import discord
+    import opus_transcode
+    import special_sounds
+
+    def make_source(source, **kwargs):
+        return StubFFmpegSource(source, max_frames=max_frames, **kwargs)
+
+    async def encode_opus(path, normalize=True):
+        with open(path, 'rb') as f:
+            return f.read()
+
+    async def encode_opus_frames(path):
+        return [FRAME] * max_frames
+
+    discord.FFmpegPCMAudio = make_source
+    discord.FFmpegOpusAudio = make_source
+    opus_transcode.encode_opus = encode_opus
+    special_sounds.encode_opus_frames = encode_opus_frames
+
+
+# --- myinstants stand-in ---
+async def start_fixture_server(mp3_paths, latency):
+    from aiohttp import web
+
+    pages = {}
+    for query in QUERIES:
+        with open(os.path.join(FIXTURE_DIR, f"search_{query.replace(' ', '_')}.html"), encoding='utf-8') as f:
+            pages[query] = f.read()
+    sounds = []
+    for path in mp3_paths:
+        with open(path, 'rb') as f:
+            sounds.append(f.read())
+
+    async def search(request):
+        await asyncio.sleep(latency)
+        page = pages.get(request.query.get('name', ''))
+        if page is None:
+            return web.Response(status=404)
+        return web.Response(text=page, content_type='text/html')
+
+    async def sound(request):
+        await asyncio.sleep(latency)
+        name = request.match_info['name']
+        return web.Response(body=sounds[hash(name) % len(sounds)], content_type='audio/mpeg')
+
+    app = web.Application()
+    app.router.add_get('/en/search/', search)
+    app.router.add_get('/media/sounds/{name}', sound)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+# --- Discord stand-ins ---
+_message_ids = itertools.count(1)
+
+
+class FakeMessage:
+    def __init__(self, content, view):
+        self.id = next(_message_ids)
+        self.content = content
+        self.view = view
+
+    async def edit(self, content=None, view=None, **kwargs):
+        if content is not None:
+            self.content = content
+        self.view = view
+
+
+class FakeResponse:
+    def __init__(self, interaction):
+        self._interaction = interaction
+        self._done = False
+
+    def is_done(self):
+        return self._done
+
+    async def defer(self, **kwargs):
+        await asyncio.sleep(self._interaction.api_latency)
+        self._done = True
+
+    async def send_message(self, content=None, **kwargs):
+        await asyncio.sleep(self._interaction.api_latency)
+        self._done = True
+        self._interaction.reply(content, None)
+
+
+class FakeFollowup:
+    def __init__(self, interaction):
+        self._interaction = interaction
+
+    async def send(self, content=None, view=None, wait=False, **kwargs):
+        await asyncio.sleep(self._interaction.api_latency)
+        return self._interaction.reply(content, view)
+
+
+class FakeInteraction:
+    """
+    Just enough of discord.Interaction for the command handlers and button
+    callbacks. Records when the first visible reply was sent.
+    """
+
+    def __init__(self, user, guild, api_latency, data=None, message=None):
+        self.user = user
+        self.guild = guild
+        self.guild_id = guild.id
+        self.api_latency = api_latency
+        self.data = data or {}
+        self.message = message
+        self.created_at = datetime.datetime.now(datetime.timezone.utc)
+        self.extras = {}
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
+        self.messages = []
+        self.replied_at = None
+
+    def reply(self, content, view):
+        message = FakeMessage(content, view)
+        self.messages.append(message)
+        if self.replied_at is None:
+            self.replied_at = time.perf_counter()
+        return message
+
+
+class FakeVoiceClient:
+    """
+    Plays sources on a thread like discord.VoiceClient, either as fast as
+    frames can be read or in real time (20ms per frame).
+    """
+
+    def __init__(self, channel, realtime):
+        self.channel = channel
+        self.guild = channel.guild
+        self.realtime = realtime
+        self._connected = True
+        self._playing = None
+
+    def is_connected(self):
+        return self._connected
+
+    def is_playing(self):
+        return self._playing is not None and not self._playing.is_set()
+
+    def is_paused(self):
+        return False
+
+    async def move_to(self, channel):
+        self.channel = channel
+
+    async def disconnect(self, force=False):
+        self.stop()
+        self._connected = False
+        self.guild.voice_client = None
+
+    def stop(self):
+        if self._playing is not None:
+            self._playing.set()
+
+    def play(self, source, after=None):
+        stopped = threading.Event()
+        self._playing = stopped
+        loop = asyncio.get_running_loop()
+
+        def run():
+            error = None
+            try:
+                first = True
+                while not stopped.is_set():
+                    frame = source.read()
+                    if not frame:
+                        break
+                    if first:
+                        first = False
+                        loop.call_soon_threadsafe(self.guild.audio_started)
+                    if self.realtime:
+                        time.sleep(0.02)
+            except Exception as e:
+                error = e
+            finally:
+                stopped.set()
+                source.cleanup()
+                if after:
+                    after(error)
+
+        threading.Thread(target=run, daemon=True).start()
+
+
+class FakeVoiceChannel:
+    def __init__(self, guild, connect_latency, realtime):
+        self.guild = guild
+        self.id = guild.id * 10
+        self.connect_latency = connect_latency
+        self.realtime = realtime
+
+    async def connect(self, timeout=60.0, **kwargs):
+        await asyncio.sleep(self.connect_latency)
+        voice_client = FakeVoiceClient(self, self.realtime)
+        self.guild.voice_client = voice_client
+        return voice_client
+
+    def __str__(self):
+        return f"bench-voice-{self.id}"
+
+
+class FakeGuild:
+    def __init__(self, guild_id, connect_latency, realtime):
+        self.id = guild_id
+        self.voice_client = None
+        self.first_audio_at = None
+        self.channel = FakeVoiceChannel(self, connect_latency, realtime)
+
+    def audio_started(self):
+        if self.first_audio_at is None:
+            self.first_audio_at = time.perf_counter()
+
+
+# --- Load generation ---
+class Recorder:
+    def __init__(self):
+        self.replies = {}
+        self.first_audio = {}
+        self.errors = {}
+
+    def record(self, op, replied, audio):
+        self.replies.setdefault(op, [])
+        self.first_audio.setdefault(op, [])
+        if replied is not None:
+            self.replies[op].append(replied)
+        if audio is not None:
+            self.first_audio[op].append(audio)
+        else:
+            self.errors[op] = self.errors.get(op, 0) + 1
+
+
+async def wait_for_audio(guild, timeout):
+    deadline = time.perf_counter() + timeout
+    while guild.first_audio_at is None and time.perf_counter() < deadline:
+        await asyncio.sleep(0.002)
+    return guild.first_audio_at
+
+
+async def wait_for_idle(bot_module, guild, timeout):
+    guild_queue = bot_module.bot.audio_queues.get(guild)
+    deadline = time.perf_counter() + timeout
+    while (guild_queue.list() or (guild.voice_client and guild.voice_client.is_playing())) and time.perf_counter() < deadline:
+        await asyncio.sleep(0.005)
+
+
+async def run_op(bot_module, op, guild, user, args, rng):
+    """
+    Runs one command and returns (seconds until reply, seconds until first audio).
+    """
+    guild.first_audio_at = None
+    interaction = FakeInteraction(user, guild, args.api_latency)
+    started = time.perf_counter()
+    bot_module.record_interaction(interaction, op)
+
+    if op == 'hin':
+        await bot_module.hin.callback(interaction, rng.choice(PHRASES))
+    elif op == 'namit':
+        await bot_module.namit.callback(interaction, rng.choice(PHRASES))
+    elif op == 'special':
+        await bot_module.hin.callback(interaction, rng.choice(SPECIALS))
+    elif op == 'search':
+        await bot_module.searchsound.callback(interaction, rng.choice(QUERIES))
+        views = [message.view for message in interaction.messages if message.view is not None]
+        if views:
+            # Press the first sound button, as a user would
+            view = views[-1]
+            sound = view.downloaded_sounds_info[0]
+            press = FakeInteraction(
+                user, guild, args.api_latency,
+                data={'custom_id': f"play_sound_{sound['unique_id']}_0"},
+                message=interaction.messages[0],
+            )
+            bot_module.record_interaction(press, 'button')
+            await view.interaction_callback(press)
+    elif op == 'indexed':
+        # Focus the field, type the first letters of one of the suggestions, pick the top match
+        suggestions = await bot_module.searchsound_autocomplete(interaction, '')
+        typed = rng.choice(suggestions).name[:3]
+        choices = await bot_module.searchsound_autocomplete(interaction, typed)
+        await bot_module.searchsound.callback(interaction, choices[0].value)
+
+    replied = interaction.replied_at - started if interaction.replied_at else None
+    first_audio = await wait_for_audio(guild, args.timeout)
+    return replied, (first_audio - started) if first_audio else None
+
+
+async def simulate_guild(bot_module, index, ops, args, recorder):
+    rng = random.Random(args.seed + index)
+    guild = FakeGuild(1000 + index, args.connect_latency, args.realtime)
+    user = types.SimpleNamespace(id=USER_ID, voice=types.SimpleNamespace(channel=guild.channel))
+    for op in ops:
+        try:
+            replied, audio = await run_op(bot_module, op, guild, user, args, rng)
+        except Exception as e:
+            print(f"guild {guild.id}: {op} raised {e!r}")
+            replied, audio = None, None
+        recorder.record(op, replied, audio)
+        await wait_for_idle(bot_module, guild, args.timeout)
+
+
+def parse_mix(mix):
+    weights = {}
+    for part in mix.split(','):
+        name, _, weight = part.partition('=')
+        weights[name.strip()] = int(weight or 1)
+    unknown = set(weights) - {'hin', 'namit', 'special', 'search', 'indexed'}
+    if unknown:
+        raise SystemExit(f"Unknown operations in --mix: {', '.join(sorted(unknown))}")
+    return weights
+
+
+def ms(samples, pct):
+    return f"{percentile(samples, pct) * 1000:>9.1f}" if samples else f"{'-':>9}"
+
+
+async def main_async(args):
+    mp3_paths = [os.path.join(ROOT, path) for path in ("mew.mp3", "gyatt.mp3", "humi.mp3", "babloo.mp3")]
+    with open(mp3_paths[0], 'rb') as f:
+        install_stub_tts(args.tts_latency, f.read())
+    if not args.real_ffmpeg:
+        install_stub_ffmpeg(args.frames)
+
+    import scrape
+    import bot as bot_module
+
+    runner, base_url = await start_fixture_server(mp3_paths, args.http_latency)
+    scrape.BASE_URL = base_url
+    bot_module.loop_monitor.start()
+
+    weights = parse_mix(args.mix)
+    rng = random.Random(args.seed)
+    plans = [rng.choices(list(weights), weights=list(weights.values()), k=args.ops) for _ in range(args.guilds)]
+
+    recorder = Recorder()
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(simulate_guild(bot_module, i, ops, args, recorder) for i, ops in enumerate(plans)))
+        wall = time.perf_counter() - started
+    finally:
+        bot_module.loop_monitor.stop()
+        await scrape.close_session()
+        await runner.cleanup()
+        bot_module.tts_executor.shutdown()
+
+    total = sum(len(ops) for ops in plans)
+    print(f"\n{args.guilds} guilds x {args.ops} ops, mix {args.mix}, "
+          f"{'real' if args.real_ffmpeg else 'stub'} FFmpeg, {'real-time' if args.realtime else 'fast'} playback\n")
+    print(f"{'op':<8} {'count':>6} {'errors':>6} {'reply p50':>9} {'reply p99':>9} {'audio p50':>9} {'audio p99':>9}")
+    for op in weights:
+        replies = recorder.replies.get(op, [])
+        audio = recorder.first_audio.get(op, [])
+        count = sum(ops.count(op) for ops in plans)
+        print(f"{op:<8} {count:>6} {recorder.errors.get(op, 0):>6} {ms(replies, 50)} {ms(replies, 99)} {ms(audio, 50)} {ms(audio, 99)}")
+    print(f"\n{total} ops in {wall:.2f}s: {total / wall:.1f} ops/s")
+    all_audio = [sample for samples in recorder.first_audio.values() for sample in samples]
+    if all_audio:
+        print(f"time to first audio overall: mean {statistics.mean(all_audio) * 1000:.1f}ms, "
+              f"p50 {percentile(all_audio, 50) * 1000:.1f}ms, p99 {percentile(all_audio, 99) * 1000:.1f}ms")
+
+    print()
+    format_stats = bot_module.format_stats
+    print(f"event loop lag:  {format_stats(bot_module.loop_monitor.stats())}")
+    print(f"tts executor:    {format_stats(bot_module.tts_executor.stats())}")
+    print(f"tts cache:       {format_stats(bot_module.tts_cache.stats())}")
+    print(f"mp3 store:       {format_stats(scrape.get_mp3_store().stats())}")
+    print(f"search cache:    {format_stats(scrape.search_cache.stats())}")
+    print(f"voice:           {format_stats(bot_module.bot.voice.stats())}")
+    print(f"sound index:     {format_stats(bot_module.sound_index.stats())}")
+    for flight in (bot_module.tts_flights, scrape.search_flights, scrape.download_flights):
+        print(f"{flight.name + ' flights:':<16} {format_stats(flight.stats())}")
+    if args.metrics:
+        print()
+        print(bot_module.metrics.registry.render())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--guilds', type=int, default=20, help="Concurrent simulated guilds")
+    parser.add_argument('--ops', type=int, default=10, help="Commands run by each guild")
+    parser.add_argument('--mix', default='hin=4,namit=1,special=1,search=2,indexed=1', help="Weighted operations: hin, namit, special, search, indexed")
+    parser.add_argument('--tts-latency', type=float, default=0.3, help="Seconds the stub TTS engine takes per phrase")
+    parser.add_argument('--http-latency', type=float, default=0.05, help="Seconds the fixture server waits before answering")
+    parser.add_argument('--api-latency', type=float, default=0.03, help="Seconds each Discord API call takes")
+    parser.add_argument('--connect-latency', type=float, default=0.2, help="Seconds a voice connect takes")
+    parser.add_argument('--frames', type=int, default=50, help="Frames per clip with the stub FFmpeg")
+    parser.add_argument('--timeout', type=float, default=15, help="Seconds to wait for audio before counting an error")
+    parser.add_argument('--realtime', action='store_true', help="Play 20ms per frame instead of as fast as possible")
+    parser.add_argument('--real-ffmpeg', action='store_true', help="Use the real FFmpeg sources (needs ffmpeg on PATH)")
+    parser.add_argument('--stream', action='store_true', help="Run /searchsound with SEARCH_STREAM_PLAYBACK=1")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--metrics', action='store_true', help="Print what /metrics would serve at the end")
+    parser.add_argument('--verbose', action='store_true', help="Keep the bot's INFO logging")
+    args = parser.parse_args()
+
+    workdir = prepare_environment(args)
+    print(f"Caches in {workdir}")
+    import logging
+    logging.basicConfig(level=logging.INFO)
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+    asyncio.run(main_async(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,75 @@
+import time
+# Taken before anything heavy is imported, for the time-to-ready breakdown
+STARTED_AT = time.perf_counter()
 import discord
 from discord import app_commands
 import os
-from gtts import gTTS
 import asyncio
-from flask import Flask
 from threading import Thread
 import logging
+import io
 import uuid
-from scrape import search_myinstants_sounds, download_mp3
-DOWNLOAD_DIR="./sounds/"
+import hashlib
+import json
+import functools
+from scrape import search_myinstants_sounds, fetch_mp3, release_mp3, acquire_cached_mp3, stream_mp3, close_session, search_flights, download_flights, search_cache, get_mp3_store
+from disk_cache import DiskCache
+from audio_queue import AudioQueueManager, QueueItem
+from special_sounds import SpecialSoundCache
+from async_utils import BlockingExecutor, LoopLagMonitor
+from sound_sessions import SoundSessionRegistry
+from voice_manager import VoiceConnectionManager
+from tts_pipeline import split_text
+from singleflight import SingleFlight
+from tts_engines import ENGINES, get_engine
+from opus_transcode import OpusTranscoder
+import metrics
+from health_server import HealthServer, health_status, readiness_status
+from sound_index import SoundIndex
+from guild_settings import GuildSettings
+startup = metrics.StartupTimer(STARTED_AT)
+startup.mark('imports')
+TTS_CACHE_DIR = os.environ.get('TTS_CACHE_DIR', './tts_cache/')
+TTS_CACHE_MAX_BYTES = int(os.environ.get('TTS_CACHE_MAX_BYTES', 200 * 1024 * 1024))
+TTS_CACHE_MAX_ENTRIES = int(os.environ.get('TTS_CACHE_MAX_ENTRIES', 5000))
+TTS_WORKERS = int(os.environ.get('TTS_WORKERS', 4))
+# Default TTS backend, plus the one used when it fails or takes longer than the timeout
+TTS_ENGINE = os.environ.get('TTS_ENGINE', 'gtts')
+TTS_FALLBACK_ENGINE = os.environ.get('TTS_FALLBACK_ENGINE', 'espeak')
+TTS_FALLBACK_TIMEOUT = float(os.environ.get('TTS_FALLBACK_TIMEOUT', 4))
+TTS_FALLBACK_WORKERS = int(os.environ.get('TTS_FALLBACK_WORKERS', 2))
+SEARCH_DOWNLOAD_CONCURRENCY = int(os.environ.get('SEARCH_DOWNLOAD_CONCURRENCY', 3))
+SEARCH_DOWNLOAD_DEADLINE = float(os.environ.get('SEARCH_DOWNLOAD_DEADLINE', 10))
+# When enabled, /searchsound shows buttons straight after the search and each
+# sound is streamed from myinstants into FFmpeg when its button is pressed.
+SEARCH_STREAM_PLAYBACK = os.environ.get('SEARCH_STREAM_PLAYBACK', '0') == '1'
+SOUND_SESSION_TTL = float(os.environ.get('SOUND_SESSION_TTL', 240))
+SOUND_SESSION_MAX = int(os.environ.get('SOUND_SESSION_MAX', 500))
+SOUND_SESSION_MAX_BYTES = int(os.environ.get('SOUND_SESSION_MAX_BYTES', 200 * 1024 * 1024))
+VOICE_IDLE_TIMEOUT = float(os.environ.get('VOICE_IDLE_TIMEOUT', 300))
+OPUS_STORE_DIR = os.environ.get('OPUS_STORE_DIR', './sounds/opus/')
+OPUS_STORE_MAX_BYTES = int(os.environ.get('OPUS_STORE_MAX_BYTES', 300 * 1024 * 1024))
+# Long messages are split into chunks that are synthesized concurrently and played in order
+TTS_CHUNK_CHARS = int(os.environ.get('TTS_CHUNK_CHARS', 150))
+TTS_FIRST_CHUNK_CHARS = int(os.environ.get('TTS_FIRST_CHUNK_CHARS', 60))
+# How many chunks of one message are synthesized at the same time, so a long
+# message cannot take every TTS worker while other guilds wait
+TTS_CHUNKS_AHEAD = int(os.environ.get('TTS_CHUNKS_AHEAD', 2))
+# 'async' serves the keep-alive/health endpoints from aiohttp on the bot's event loop;
+# 'flask' runs the original Flask server in a background thread
+HEALTH_SERVER = os.environ.get('HEALTH_SERVER', 'flask')
+# Use the PORT environment variable provided by Render, default to 8080
+HEALTH_PORT = int(os.environ.get('PORT', 8080))
+# 'auto' only syncs the command tree when its hash differs from the one stored in
+# COMMAND_HASH_FILE (point it at a persistent disk to skip syncs across deploys);
+# 'always' syncs on every start, 'never' leaves the registered commands alone
+COMMAND_SYNC = os.environ.get('COMMAND_SYNC', 'auto')
+COMMAND_HASH_FILE = os.environ.get('COMMAND_HASH_FILE', './.command_tree.sha256')
+# Titles and URLs of every myinstants sound seen so far, for autocomplete
+SOUND_INDEX_FILE = os.environ.get('SOUND_INDEX_FILE', './sounds/index.json')
+SOUND_INDEX_MAX = int(os.environ.get('SOUND_INDEX_MAX', 10000))
+# Per-guild choices such as the /ttsengine pick, kept across restarts
+GUILD_SETTINGS_FILE = os.environ.get('GUILD_SETTINGS_FILE', './sounds/guild_settings.json')
 # --- Basic Setup ---
 # It's recommended to use a logger for better debugging, especially on a server
 logging.basicConfig(level=logging.INFO)
@@ -26,18 +87,35 @@ CLIENT_ID = "1227213236747898970" # While not used in the logic, kept for refere
 
 # --- Flask Web Server for Render Cold Start ---
 # This simple web server responds to HTTP requests, which keeps the Render service "warm".
-app = Flask('')
-
-@app.route('/')
-def home():
-    return "HindiBot is alive!"
-@app.route('/wakeup')
-def wakeup():
-    return "Server is awake and responding.", 200
+# With HEALTH_SERVER=async the same endpoints are served by health_server.HealthServer instead.
+def create_flask_app():
+    # Only imported when the Flask server is actually used
+    from flask import Flask, Response, jsonify
+
+    app = Flask('')
+
+    @app.route('/')
+    def home():
+        return "HindiBot is alive!"
+    @app.route('/wakeup')
+    def wakeup():
+        return "Server is awake and responding.", 200
+    @app.route('/healthz')
+    def healthz():
+        ok, details = health_status(bot, loop_monitor)
+        return jsonify(details), 200 if ok else 503
+    @app.route('/readyz')
+    def readyz():
+        ok, details = readiness_status(bot)
+        return jsonify(details), 200 if ok else 503
+    @app.route('/metrics')
+    def metrics_endpoint():
+        # Prometheus text exposition format
+        return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
+    return app
+
 def run_flask():
-    # Use the PORT environment variable provided by Render, default to 8080
-    port = int(os.environ.get('PORT', 8080))
-    app.run(host='0.0.0.0', port=port)
+    create_flask_app().run(host='0.0.0.0', port=HEALTH_PORT)
 
 def start_server_thread():
     server_thread = Thread(target=run_flask)
@@ -45,19 +123,270 @@ def start_server_thread():
     server_thread.start()
     logging.info("Flask server started in a background thread.")
 
+# --- TTS Audio Cache ---
+# Synthesized audio is stored on disk keyed by a hash of (engine, text, lang, voice options),
+# so phrases that get repeated are played without calling the TTS backend again.
+tts_cache = DiskCache(TTS_CACHE_DIR, max_bytes=TTS_CACHE_MAX_BYTES, max_entries=TTS_CACHE_MAX_ENTRIES)
+
+def synthesize_tts(text, lang='hi', engine_name=TTS_ENGINE):
+    """
+    Returns audio bytes with `text` spoken, using the cache when possible.
+    Every caller gets its own buffer, so concurrent requests never share a file.
+    """
+    engine = get_engine(engine_name)
+    if engine is None:
+        raise ValueError(f"TTS engine '{engine_name}' is not available")
+
+    key = engine.cache_key(text, lang)
+    data = tts_cache.read(key)
+    if data is not None:
+        logging.info(f"TTS cache hit for '{text}' ({engine_name})")
+        metrics.TTS_REQUESTS.inc(engine=engine_name, result='hit')
+        return data
+
+    metrics.TTS_REQUESTS.inc(engine=engine_name, result='miss')
+    with metrics.timed('tts_synthesis'):
+        data = engine.synthesize(text, lang)
+    tts_cache.put(key, data)
+    return data
+
+# TTS backends are blocking, so synthesis runs on a bounded thread pool instead of the event loop
+tts_executor = BlockingExecutor(max_workers=TTS_WORKERS, name="tts")
+# The fallback engine has its own workers, so it still answers while slow
+# primary calls (which keep running after a timeout) hold the main pool
+tts_fallback_executor = BlockingExecutor(max_workers=TTS_FALLBACK_WORKERS, name="tts-fallback")
+loop_monitor = LoopLagMonitor()
+# Identical phrases being synthesized at the same moment share one TTS call
+tts_flights = SingleFlight('tts')
+
+async def synthesize(text, lang, engine_name, executor=tts_executor, timeout=None):
+    run = functools.partial(executor.run, timeout=timeout)
+    return await tts_flights.do((engine_name, text, lang, timeout), run, synthesize_tts, text, lang, engine_name)
+
+async def synthesize_with_fallback(text, lang, engine_name, timeout=None):
+    """
+    Synthesizes with `engine_name` and returns (audio, engine used). Switches
+    to TTS_FALLBACK_ENGINE if it fails or, given a `timeout`, if the engine
+    call itself runs longer than that; waiting for a free worker does not
+    count. A slow primary keeps running in the background so its result
+    lands in the cache for next time.
+    """
+    fallback = TTS_FALLBACK_ENGINE
+    if not fallback or fallback == engine_name or get_engine(fallback) is None:
+        return await synthesize(text, lang, engine_name), engine_name
+
+    try:
+        return await synthesize(text, lang, engine_name, timeout=timeout), engine_name
+    except Exception as e:
+        reason = "timed out" if isinstance(e, asyncio.TimeoutError) else f"failed ({e})"
+        logging.warning(f"TTS engine '{engine_name}' {reason}, falling back to '{fallback}'")
+        return await synthesize(text, lang, fallback, executor=tts_fallback_executor), fallback
+
+def engine_for(guild):
+    return bot.guild_settings.get(guild.id, 'tts_engine', TTS_ENGINE)
+
+def ffmpeg_source(source_cls, *args, **kwargs):
+    # Creating an FFmpeg source spawns the process, so time it
+    with metrics.timed('ffmpeg_spawn'):
+        return source_cls(*args, **kwargs)
+
+def audio_from_bytes(data):
+    """
+    Wraps in-memory audio in a source that feeds FFmpeg through its stdin pipe.
+    """
+    return ffmpeg_source(discord.FFmpegPCMAudio, io.BytesIO(data), pipe=True)
+
+async def prepare_tts(text, lang='hi', engine_name=TTS_ENGINE):
+    """
+    Synthesizes `text` and returns the QueueItems that speak it.
+
+    Long text is split at sentence/clause boundaries and the chunks are
+    synthesized in order, TTS_CHUNKS_AHEAD at a time, so the next chunk is
+    usually ready before the one playing ends. Only the first chunk is awaited
+    here, so playback can start while later chunks are still being produced;
+    queued back to back, the chunks play in order.
+
+    The engine is picked on the first chunk (falling back if it is slow or
+    fails) and the rest of the message uses the same one, so the voice does
+    not change halfway; later chunks only fall back if that engine fails.
+    """
+    chunks = split_text(text, TTS_CHUNK_CHARS, TTS_FIRST_CHUNK_CHARS) if len(text) > TTS_FIRST_CHUNK_CHARS else [text]
+
+    # Synthesis errors for the first chunk surface to the caller
+    first = asyncio.ensure_future(synthesize_with_fallback(chunks[0], lang, engine_name, TTS_FALLBACK_TIMEOUT))
+    _, engine_name = await first
+
+    window = asyncio.Semaphore(TTS_CHUNKS_AHEAD)
+
+    async def synthesize_chunk(chunk):
+        # The semaphore wakes waiters in order, so chunks start in the order they play
+        async with window:
+            return await synthesize_with_fallback(chunk, lang, engine_name)
+
+    synth_tasks = [first] + [asyncio.ensure_future(synthesize_chunk(chunk)) for chunk in chunks[1:]]
+
+    def make_loader(task):
+        async def load_audio():
+            data, _ = await task
+            return audio_from_bytes(data)
+        return load_audio
+
+    if len(chunks) == 1:
+        return [QueueItem(text, make_loader(synth_tasks[0]))]
+    return [
+        QueueItem(f"{chunk} ({i}/{len(chunks)})", make_loader(task))
+        for i, (chunk, task) in enumerate(zip(chunks, synth_tasks), start=1)
+    ]
+
+def enqueue_items(guild, items, requested_at=None):
+    """
+    Queues clips back to back in the guild's playback queue and returns the
+    position of the first one (0 means it starts playing right away).
+    `requested_at` is when the command came in, for first-audio timing.
+    """
+    items[0].requested_at = requested_at
+    return bot.audio_queues.get(guild).enqueue_many(items)
+
+def describe_position(verb, title, position):
+    if position == 0:
+        return f"{verb}: `{title}`"
+    return f"Queued: `{title}` (position {position})"
+
+# --- Special Sound Files ---
+# These bundled clips are the most played ones, so they are encoded to Opus once
+# and kept in memory instead of spawning FFmpeg on every play.
+SPECIAL_FILES = {
+    "mew": "mew.mp3",
+    "gyatt": "gyatt.mp3",
+    "humi": "humi.mp3",
+    "mcstan": "tmkc_mcstan.mp3",
+    "babloo":"babloo.mp3"
+}
+special_sounds = SpecialSoundCache(SPECIAL_FILES)
+
+# --- Sound Index ---
+# Bundled clips plus every myinstants sound seen in a search, for autocomplete.
+# Picking one plays it straight away, without searching myinstants again.
+sound_index = SoundIndex(SOUND_INDEX_FILE, max_entries=SOUND_INDEX_MAX)
+for name in SPECIAL_FILES:
+    sound_index.add_special(name)
+# Autocomplete choices for indexed sounds carry this prefix followed by the entry id
+INDEX_CHOICE_PREFIX = "sound:"
+
+# --- Opus Transcoding ---
+# Downloaded sounds are converted to normalized Opus once in the background, so
+# repeat plays pass the packets straight through instead of re-encoding every time.
+opus_sounds = OpusTranscoder(OPUS_STORE_DIR, max_bytes=OPUS_STORE_MAX_BYTES)
+
+def release_session_files(session):
+    # The files live in the shared MP3 store, so just drop our references;
+    # the store evicts them once nothing else is using them.
+    for sound_info in session.sounds:
+        if sound_info['path']:
+            release_mp3(sound_info['mp3_url'])
+    logging.info(f"Released sound files for session {session.unique_id}")
+
+# --- Interaction Metrics ---
+def record_interaction(interaction, command):
+    """
+    Stamps when a handler picked up the interaction and records how long it
+    took to get here from Discord, plus a per-guild counter.
+    """
+    interaction.extras['received_at'] = time.perf_counter()
+    metrics.INTERACTIONS.inc(guild=interaction.guild_id, command=command)
+    delay = (discord.utils.utcnow() - interaction.created_at).total_seconds()
+    metrics.observe_stage('interaction_received', max(0.0, delay))
+
+class InstrumentedCommandTree(app_commands.CommandTree):
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        command = interaction.data.get('name', 'unknown')
+        if interaction.type == discord.InteractionType.autocomplete:
+            command += ':autocomplete'
+        record_interaction(interaction, command)
+        return True
+
+def command_tree_hash(tree, application_id):
+    # Same payload tree.sync() uploads, so any change that needs a sync changes the hash
+    payload = sorted((command.to_dict(tree) for command in tree.get_commands()), key=lambda command: command['name'])
+    return hashlib.sha256(json.dumps([application_id, payload], sort_keys=True).encode()).hexdigest()
+
 # --- Discord Bot Setup ---
 class HindiBot(discord.Client):
     def __init__(self, *, intents: discord.Intents):
         super().__init__(intents=intents)
         # CommandTree holds all the application commands
-        self.tree = app_commands.CommandTree(self)
-        self.temp_sound_files = {} 
+        self.tree = InstrumentedCommandTree(self)
+        # Sounds offered by /searchsound messages, looked up by unique id or message id
+        self.sound_sessions = SoundSessionRegistry(
+            release_session_files,
+            ttl=SOUND_SESSION_TTL,
+            max_sessions=SOUND_SESSION_MAX,
+            max_bytes=SOUND_SESSION_MAX_BYTES,
+        )
+        # One playback queue per guild, so clips no longer cut each other off
+        self.audio_queues = AudioQueueManager()
+        # Per-guild settings, like the TTS engine picked with /ttsengine (guilds without one use TTS_ENGINE)
+        self.guild_settings = GuildSettings(GUILD_SETTINGS_FILE)
+        # Voice connections stay warm between commands instead of reconnecting each time
+        # Only reconnected after an unexpected drop while the guild still has audio playing or queued
+        self.voice = VoiceConnectionManager(self, idle_timeout=VOICE_IDLE_TIMEOUT, is_active=self.audio_queues.is_active)
+        # Keep-alive/health endpoints on this event loop (HEALTH_SERVER=async)
+        self.health_server = None
+        if HEALTH_SERVER == 'async':
+            self.health_server = HealthServer(self, loop_monitor, port=HEALTH_PORT, render_metrics=metrics.registry.render)
 
     async def setup_hook(self):
-        # This syncs the commands to your specific guild.
-        # For global commands, remove the guild argument.
+        startup.mark('login')
+        # Answer Render's pings while we are still logging in
+        if self.health_server:
+            await self.health_server.start()
+        await self.sync_commands()
+        startup.mark('command_sync')
+        # Encode the special sounds in the background so the first play is instant too
+        asyncio.create_task(special_sounds.warm())
+        loop_monitor.start()
+        self.sound_sessions.start()
+        self.voice.start()
+        sound_index.start()
+
+    async def sync_commands(self):
+        """
+        Syncs the global commands with Discord, skipping the upload when the
+        tree is unchanged since the last sync (see COMMAND_SYNC).
+        """
+        if COMMAND_SYNC == 'never':
+            logging.info("Command sync disabled (COMMAND_SYNC=never).")
+            return
+
+        tree_hash = command_tree_hash(self.tree, self.application_id)
+        if COMMAND_SYNC == 'auto':
+            try:
+                with open(COMMAND_HASH_FILE) as f:
+                    if f.read().strip() == tree_hash:
+                        logging.info("Command tree unchanged since the last sync, skipping it.")
+                        return
+            except OSError:
+                pass
+
         await self.tree.sync() # Use this for global commands
         logging.info("Commands synced successfully.")
+        try:
+            with open(COMMAND_HASH_FILE, 'w') as f:
+                f.write(tree_hash)
+        except OSError as e:
+            logging.warning(f"Could not store the command tree hash: {e}")
+
+    async def close(self):
+        loop_monitor.stop()
+        self.sound_sessions.stop()
+        self.voice.stop()
+        sound_index.stop()
+        if self.health_server:
+            await self.health_server.stop()
+        await close_session()
+        tts_executor.shutdown()
+        tts_fallback_executor.shutdown()
+        await super().close()
 
 # Define the necessary intents for the bot
 intents = discord.Intents.default()
@@ -67,6 +396,22 @@ intents.voice_states = True
 # Instantiate the bot
 bot = HindiBot(intents=intents)
 
+# --- Metrics ---
+# Every component's stats() shows up on /metrics as gauges, next to the stage histograms
+metrics.registry.add_stats('startup', "Time to ready breakdown", startup.stats)
+metrics.registry.add_stats('event_loop', "Event loop lag", loop_monitor.stats)
+metrics.registry.add_stats('tts_executor', "TTS thread pool", tts_executor.stats)
+metrics.registry.add_stats('tts_fallback_executor', "Fallback TTS thread pool", tts_fallback_executor.stats)
+metrics.registry.add_stats('tts_cache', "TTS audio cache", tts_cache.stats)
+metrics.registry.add_stats('search_cache', "Search result cache", search_cache.stats)
+metrics.registry.add_stats('mp3_store', "Downloaded MP3 store", lambda: get_mp3_store().stats())
+metrics.registry.add_stats('opus_store', "Transcoded Opus store", opus_sounds.stats)
+metrics.registry.add_stats('sound_sessions', "Sound button sessions", bot.sound_sessions.stats)
+metrics.registry.add_stats('voice', "Voice connections", bot.voice.stats)
+metrics.registry.add_stats('sound_index', "Sound index", sound_index.stats)
+for flight in (tts_flights, search_flights, download_flights):
+    metrics.registry.add_stats(f'{flight.name}_flights', "Coalesced calls", flight.stats)
+
 # --- Custom View for Sound Buttons ---
 class SoundButtonView(discord.ui.View):
     def __init__(self, downloaded_sounds_info: list, original_user_id: str):
@@ -76,12 +421,18 @@ class SoundButtonView(discord.ui.View):
 
         # Create a button for each sound
         for i, sound in enumerate(downloaded_sounds_info):
-            # Custom IDs are required for persistent buttons.
-            # We embed the index and a unique ID for the interaction to retrieve the sound path later.
-            custom_id = f"play_sound_{sound['unique_id']}_{i}"
-            self.add_item(discord.ui.Button(label=sound['title'], custom_id=custom_id, style=discord.ButtonStyle.primary))
+            self.add_sound_button(i, sound)
+
+    def add_sound_button(self, index, sound):
+        # Custom IDs are required for persistent buttons.
+        # We embed the index and a unique ID for the interaction to retrieve the sound path later.
+        custom_id = f"play_sound_{sound['unique_id']}_{index}"
+        button = discord.ui.Button(label=sound['title'], custom_id=custom_id, style=discord.ButtonStyle.primary)
+        button.callback = self.interaction_callback
+        self.add_item(button)
 
     async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        record_interaction(interaction, 'button')
         # Only allow the original user (or authorized user) to interact with these buttons
         if str(interaction.user.id) != self.original_user_id and str(interaction.user.id) != AUTHORIZED_USER_ID:
             await interaction.response.send_message("You are not authorized to use these buttons.", ephemeral=True)
@@ -90,9 +441,9 @@ class SoundButtonView(discord.ui.View):
 
     @discord.ui.button(label="Stop All", style=discord.ButtonStyle.danger, custom_id="stop_all_sounds")
     async def stop_all_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        voice_client = discord.utils.get(bot.voice_clients, guild=interaction.guild)
-        if voice_client and voice_client.is_playing():
-            voice_client.stop()
+        guild_queue = bot.audio_queues.get(interaction.guild)
+        guild_queue.clear()
+        if guild_queue.skip():
             await interaction.response.send_message("Stopped current playback.", ephemeral=True)
         else:
             await interaction.response.send_message("No sound is currently playing.", ephemeral=True)
@@ -101,7 +452,8 @@ class SoundButtonView(discord.ui.View):
     async def disconnect_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         voice_client = discord.utils.get(bot.voice_clients, guild=interaction.guild)
         if voice_client and voice_client.is_connected():
-            await voice_client.disconnect()
+            bot.audio_queues.get(interaction.guild).clear()
+            await bot.voice.disconnect(interaction.guild)
             # Clean up associated temporary files
             self.cleanup_temp_files(interaction.message.id)
             await interaction.response.send_message("Disconnected from voice channel.", ephemeral=True)
@@ -109,30 +461,31 @@ class SoundButtonView(discord.ui.View):
         else:
             await interaction.response.send_message("I'm not currently in a voice channel.", ephemeral=True)
 
-    # This is a dynamic callback that will handle any button not explicitly defined
-    # It catches all buttons whose custom_id starts with "play_sound_"
     async def on_timeout(self):
         # Remove the view when it times out
         if self.message:
             await self.message.edit(view=None)
-        self.cleanup_temp_files(self.message.id) # Clean up on timeout
+            self.cleanup_temp_files(self.message.id) # Clean up on timeout
 
     # Placeholder for the message to edit later (set when the view is sent)
     message: discord.Message = None
 
+    # Shared callback for the per-sound buttons created in __init__
+    # It handles all buttons whose custom_id starts with "play_sound_"
     async def interaction_callback(self, interaction: discord.Interaction):
-        if interaction.custom_id.startswith("play_sound_"):
+        custom_id = interaction.data.get('custom_id', '')
+        if custom_id.startswith("play_sound_"):
             # Extract the index from the custom_id
-            parts = interaction.custom_id.split('_')
+            parts = custom_id.split('_')
             unique_id = parts[2]
             index = int(parts[3])
 
-            if unique_id not in bot.temp_sound_files:
+            session = bot.sound_sessions.get(unique_id)
+            if session is None:
                 await interaction.response.send_message("This interaction is too old or the sounds are no longer available.", ephemeral=True)
                 return
 
-            sound_info = bot.temp_sound_files[unique_id][index]
-            sound_path = sound_info['path']
+            sound_info = session.sounds[index]
             sound_title = sound_info['title']
 
             # Check if user is in a voice channel
@@ -141,14 +494,10 @@ class SoundButtonView(discord.ui.View):
                 return
 
             voice_channel = interaction.user.voice.channel
-            voice_client = discord.utils.get(bot.voice_clients, guild=interaction.guild)
 
-            # Connect or move to the user's voice channel
+            # Connect or move to the user's voice channel (reuses a warm connection)
             try:
-                if voice_client is None:
-                    voice_client = await voice_channel.connect()
-                elif voice_client.channel != voice_channel:
-                    await voice_client.move_to(voice_channel)
+                await bot.voice.ensure(voice_channel)
             except asyncio.TimeoutError:
                 await interaction.response.send_message("Failed to connect to the voice channel (timeout).", ephemeral=True)
                 return
@@ -157,57 +506,58 @@ class SoundButtonView(discord.ui.View):
                 return
 
             # Defer the response as playing can take a moment
-            await interaction.response.defer()
+            with metrics.timed('defer'):
+                await interaction.response.defer()
+
+            # Queue the audio
+            async def load_sound():
+                opus_path = opus_sounds.get(sound_info['mp3_url'])
+                if opus_path:
+                    return ffmpeg_source(discord.FFmpegOpusAudio, opus_path, codec='copy')
+                if sound_info['path'] is None:
+                    # Streaming mode: use the stored copy if an earlier play already cached it
+                    sound_info['path'] = acquire_cached_mp3(sound_info['mp3_url'])
+                    bot.sound_sessions.update(session)
+                if sound_info['path']:
+                    opus_sounds.schedule(sound_info['mp3_url'], sound_info['path'])
+                    return ffmpeg_source(discord.FFmpegPCMAudio, sound_info['path'])
+                return ffmpeg_source(discord.FFmpegPCMAudio, stream_mp3(sound_info['mp3_url']), pipe=True)
 
-            # Play the audio
-            if voice_client.is_playing():
-                voice_client.stop()
-            
             try:
-                voice_client.play(discord.FFmpegPCMAudio(sound_path), after=lambda e: self.after_playback(e, sound_path))
-                await interaction.followup.send(f"Playing: `{sound_title}`")
+                position = enqueue_items(interaction.guild, [QueueItem(sound_title, load_sound)], interaction.extras.get('received_at'))
+                await interaction.followup.send(describe_position("Playing", sound_title, position))
+            except asyncio.QueueFull:
+                await interaction.followup.send("The playback queue is full. Try again in a bit.")
             except Exception as e:
                 logging.error(f"Playback Error: {e}")
                 await interaction.followup.send("An error occurred while trying to play the audio.")
 
     def cleanup_temp_files(self, message_id):
-        # Clean up temporary files associated with this message/interaction
-        unique_id_for_this_message = None
-        for uid, sounds_list in bot.temp_sound_files.items():
-            if sounds_list and sounds_list[0]['message_id'] == message_id:
-                unique_id_for_this_message = uid
-                break
-
-        if unique_id_for_this_message:
-            for sound_info in bot.temp_sound_files.pop(unique_id_for_this_message):
-                if os.path.exists(sound_info['path']):
-                    os.remove(sound_info['path'])
-                    logging.info(f"Cleaned up temporary file: {sound_info['path']}")
-            logging.info(f"Cleaned up all temporary files for message ID {message_id}")
-
-    def after_playback(self, error, file_path):
-        if error:
-            logging.error(f"Playback error: {error}")
-        # Optionally delete the file immediately after it finishes playing if needed
-        # (Be careful with this if the bot might try to play it again quickly)
-        # if os.path.exists(file_path):
-        #     os.remove(file_path)
-        #     logging.info(f"Deleted temporary file after playback: {file_path}")
+        # Release the sound files associated with this message/interaction
+        if bot.sound_sessions.remove_by_message(message_id):
+            logging.info(f"Cleaned up sound session for message ID {message_id}")
+
 
 
+@bot.event
+async def on_voice_state_update(member, before, after):
+    bot.voice.on_voice_state_update(member, before, after)
 
 @bot.event
 async def on_ready():
     logging.info(f'Logged in as {bot.user} (ID: {bot.user.id})')
     logging.info('------')
-    # Sync commands after the bot is ready
-    await bot.tree.sync()
+    # on_ready fires again after every reconnect; only the first one counts as startup.
+    # Commands are synced once in setup_hook, not here.
+    if 'gateway_ready' not in startup:
+        startup.mark('gateway_ready')
+        logging.info(f"Time to ready: {startup.summary()}")
 
 
 # --- Bot Commands ---
 
 @bot.tree.command(name="hin", description="Make the bot speak text in a voice channel")
-@app_commands.describe(text="The text you want the bot to speak (or 'exit' to leave)")
+@app_commands.describe(text="The text you want the bot to speak (or 'exit' to stop; it leaves after a few idle minutes)")
 async def hin(interaction: discord.Interaction, text: str):
     # 1. Authorization Check
     if str(interaction.user.id) != AUTHORIZED_USER_ID:
@@ -225,54 +575,59 @@ async def hin(interaction: discord.Interaction, text: str):
     # 3. Handle 'exit' command
     if text.lower() == "exit":
         if voice_client and voice_client.is_connected():
-            await voice_client.disconnect()
-            await interaction.response.send_message("Disconnected from the voice channel.", ephemeral=True)
+            # Stop talking but keep the connection warm; it is dropped once it has been idle long enough
+            guild_queue = bot.audio_queues.get(interaction.guild)
+            guild_queue.clear()
+            guild_queue.skip()
+            bot.voice.release(interaction.guild)
+            await interaction.response.send_message(f"Stopped. I'll leave the voice channel after {VOICE_IDLE_TIMEOUT:.0f}s of silence.", ephemeral=True)
         else:
             await interaction.response.send_message("I'm not currently in a voice channel.", ephemeral=True)
         return
 
-    # 4. Connect or move to the user's voice channel
-    if voice_client is None:
-        voice_client = await voice_channel.connect()
-    elif voice_client.channel != voice_channel:
-        await voice_client.move_to(voice_channel)
+    # 4. Connect or move to the user's voice channel (reuses a warm connection)
+    try:
+        await bot.voice.ensure(voice_channel)
+    except (asyncio.TimeoutError, discord.ClientException) as e:
+        await interaction.response.send_message(f"Failed to connect to the voice channel: {e}", ephemeral=True)
+        return
 
     # Defer the response as generating audio can take time
-    await interaction.response.defer()
+    with metrics.timed('defer'):
+        await interaction.response.defer()
 
     # 5. Handle special audio files
-    special_files = {
-        "mew": "mew.mp3",
-        "gyatt": "gyatt.mp3",
-        "humi": "humi.mp3",
-        "mcstan": "tmkc_mcstan.mp3",
-        "babloo":"babloo.mp3"
-    }
-
-    source_file = special_files.get(text.lower())
+    special_name = text.lower()
 
     # 6. Generate TTS if not a special file
-    if source_file is None:
+    if special_name in special_sounds:
+        async def load_audio():
+            return await special_sounds.source(special_name)
+
+        items = [QueueItem(text, load_audio)]
+    else:
         try:
-            tts = gTTS(text=text, lang='hi')
-            source_file = "tts.mp3"
-            tts.save(source_file)
+            items = await prepare_tts(text, 'hi', engine_for(interaction.guild))
         except Exception as e:
-            logging.error(f"gTTS Error: {e}")
+            logging.error(f"TTS Error: {e}")
             await interaction.followup.send("An error occurred while generating the TTS audio.")
             return
 
-    # 7. Play the audio
-    if voice_client.is_playing():
-        voice_client.stop()
-    
+    # 7. Queue the audio
     try:
-        voice_client.play(discord.FFmpegPCMAudio(source_file))
-        await interaction.followup.send(f"Speaking: `{text}`")
+        position = enqueue_items(interaction.guild, items, interaction.extras.get('received_at'))
+        await interaction.followup.send(describe_position("Speaking", text, position))
+    except asyncio.QueueFull:
+        await interaction.followup.send("The playback queue is full. Try again in a bit.")
     except Exception as e:
         logging.error(f"Playback Error: {e}")
         await interaction.followup.send("An error occurred while trying to play the audio.")
 
+@hin.autocomplete('text')
+async def hin_autocomplete(interaction: discord.Interaction, current: str):
+    # Suggest the bundled clips; anything else typed is still spoken as TTS
+    return [app_commands.Choice(name=entry.title, value=entry.source) for entry in sound_index.search(current, kind='special')]
+
 
 @bot.tree.command(name="namit", description="Make the bot speak text for Namit")
 @app_commands.describe(text="The text Namit wants the bot to speak")
@@ -292,37 +647,182 @@ async def namit(interaction: discord.Interaction, text: str):
 
     if text.lower() == "exit":
         if voice_client and voice_client.is_connected():
-            await voice_client.disconnect()
-            await interaction.response.send_message("Disconnected from the voice channel.", ephemeral=True)
+            # Stop talking but keep the connection warm; it is dropped once it has been idle long enough
+            guild_queue = bot.audio_queues.get(interaction.guild)
+            guild_queue.clear()
+            guild_queue.skip()
+            bot.voice.release(interaction.guild)
+            await interaction.response.send_message(f"Stopped. I'll leave the voice channel after {VOICE_IDLE_TIMEOUT:.0f}s of silence.", ephemeral=True)
         else:
             await interaction.response.send_message("I'm not currently in a voice channel.", ephemeral=True)
         return
 
-    if voice_client is None:
-        voice_client = await voice_channel.connect()
-    elif voice_client.channel != voice_channel:
-        await voice_client.move_to(voice_channel)
+    try:
+        await bot.voice.ensure(voice_channel)
+    except (asyncio.TimeoutError, discord.ClientException) as e:
+        await interaction.response.send_message(f"Failed to connect to the voice channel: {e}", ephemeral=True)
+        return
 
-    await interaction.response.defer()
+    with metrics.timed('defer'):
+        await interaction.response.defer()
 
     # The only difference for Namit is the text spoken
     spoken_text = f"{text}, said Namit."
     
     try:
-        tts = gTTS(text=spoken_text, lang='hi')
-        source_file = "tts_namit.mp3"
-        tts.save(source_file)
+        items = await prepare_tts(spoken_text, 'hi', engine_for(interaction.guild))
     except Exception as e:
-        logging.error(f"gTTS Error: {e}")
+        logging.error(f"TTS Error: {e}")
         await interaction.followup.send("An error occurred while generating the TTS audio.")
         return
 
-    if voice_client.is_playing():
-        voice_client.stop()
+    try:
+        position = enqueue_items(interaction.guild, items, interaction.extras.get('received_at'))
+        await interaction.followup.send(describe_position("Speaking", spoken_text, position))
+    except asyncio.QueueFull:
+        await interaction.followup.send("The playback queue is full. Try again in a bit.")
+    except Exception as e:
+        logging.error(f"Playback Error: {e}")
+        await interaction.followup.send("An error occurred while trying to play the audio.")
+
+# --- Playback Queue Command ---
+@bot.tree.command(name="queue", description="Show, skip or clear the sounds queued in this server")
+@app_commands.describe(action="What to do with the queue")
+@app_commands.choices(action=[
+    app_commands.Choice(name="list", value="list"),
+    app_commands.Choice(name="skip", value="skip"),
+    app_commands.Choice(name="clear", value="clear"),
+])
+async def queue(interaction: discord.Interaction, action: app_commands.Choice[str]):
+    # 1. Authorization Check
+    if str(interaction.user.id) != AUTHORIZED_USER_ID and str(interaction.user.id) != NAMIT_USER_ID:
+        await interaction.response.send_message("You are not authorized to use this command.", ephemeral=True)
+        return
+
+    guild_queue = bot.audio_queues.get(interaction.guild)
+
+    if action.value == "skip":
+        if guild_queue.skip():
+            await interaction.response.send_message("Skipped the current sound.", ephemeral=True)
+        else:
+            await interaction.response.send_message("No sound is currently playing.", ephemeral=True)
+    elif action.value == "clear":
+        removed = guild_queue.clear()
+        await interaction.response.send_message(f"Cleared {removed} queued sound(s).", ephemeral=True)
+    else:
+        titles = guild_queue.list()
+        if not titles:
+            await interaction.response.send_message("The queue is empty.", ephemeral=True)
+            return
+        lines = [f"{i}. `{title}`" + (" (playing)" if i == 1 and guild_queue.current else "") for i, title in enumerate(titles, start=1)]
+        await interaction.response.send_message("\n".join(lines), ephemeral=True)
+
+# --- TTS Engine Command ---
+@bot.tree.command(name="ttsengine", description="Pick the text-to-speech engine used in this server")
+@app_commands.describe(engine="The TTS engine to use")
+@app_commands.choices(engine=[app_commands.Choice(name=name, value=name) for name in ENGINES])
+async def ttsengine(interaction: discord.Interaction, engine: app_commands.Choice[str]):
+    if str(interaction.user.id) != AUTHORIZED_USER_ID:
+        await interaction.response.send_message("You are not authorized to use this command.", ephemeral=True)
+        return
+
+    if get_engine(engine.value) is None:
+        await interaction.response.send_message(f"The `{engine.value}` engine is not installed on this server.", ephemeral=True)
+        return
+
+    await bot.guild_settings.set(interaction.guild.id, 'tts_engine', engine.value)
+    await interaction.response.send_message(f"TTS engine for this server set to `{engine.value}`.", ephemeral=True)
+
+# --- Stats Command ---
+def format_stats(stats):
+    return ", ".join(f"{k}={v:.1f}" if isinstance(v, float) else f"{k}={v}" for k, v in stats.items())
+
+@bot.tree.command(name="stats", description="Show cache and event loop latency stats")
+async def stats(interaction: discord.Interaction):
+    if str(interaction.user.id) != AUTHORIZED_USER_ID:
+        await interaction.response.send_message("You are not authorized to use this command.", ephemeral=True)
+        return
+
+    lines = [
+        f"**Startup:** {format_stats(startup.stats())}",
+        f"**Event loop lag:** {format_stats(loop_monitor.stats())}",
+        f"**TTS executor:** {format_stats(tts_executor.stats())}",
+        f"**Fallback TTS executor:** {format_stats(tts_fallback_executor.stats())}",
+        f"**TTS cache:** {format_stats(tts_cache.stats())}",
+        f"**Sound sessions:** {format_stats(bot.sound_sessions.stats())}",
+        f"**Opus store:** {format_stats(opus_sounds.stats())}",
+        f"**Voice connections:** {format_stats(bot.voice.stats())}",
+        f"**Sound index:** {format_stats(sound_index.stats())}",
+        "**Coalesced calls:** " + "; ".join(f"{flight.name}: {format_stats(flight.stats())}" for flight in (tts_flights, search_flights, download_flights)),
+    ]
+    await interaction.response.send_message("\n".join(lines), ephemeral=True)
+
+# --- Indexed Sounds ---
+def read_file(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+async def read_mp3(mp3_url):
+    """
+    Returns the bytes of a myinstants sound, from the MP3 store when it is
+    there and downloaded otherwise, or None if the download failed.
+    """
+    path = await fetch_mp3(mp3_url)
+    if not path:
+        return None
+    try:
+        opus_sounds.schedule(mp3_url, path)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, read_file, path)
+    finally:
+        release_mp3(mp3_url)
+
+async def play_indexed_sound(interaction, entry):
+    """
+    Plays a sound picked from autocomplete: bundled clips from memory,
+    myinstants sounds from the Opus/MP3 stores (downloading just the file if
+    it was evicted). No search is made.
+    """
+    if interaction.user.voice is None:
+        await interaction.response.send_message("You need to be in a voice channel to play a sound.", ephemeral=True)
+        return
+
+    try:
+        await bot.voice.ensure(interaction.user.voice.channel)
+    except (asyncio.TimeoutError, discord.ClientException) as e:
+        await interaction.response.send_message(f"Failed to connect to the voice channel: {e}", ephemeral=True)
+        return
+
+    with metrics.timed('defer'):
+        await interaction.response.defer()
+
+    if entry.kind == 'special':
+        async def load_audio():
+            return await special_sounds.source(entry.source)
+    else:
+        data = None
+        if not opus_sounds.get(entry.source):
+            data = await read_mp3(entry.source)
+            if data is None:
+                await interaction.followup.send(f"Could not download `{entry.title}`. Please try again later.")
+                return
+
+        async def load_audio():
+            # Looked up when the clip is loaded, since the Opus store can evict the
+            # file while it waits in the queue; the MP3 is fetched again if so
+            opus_path = opus_sounds.get(entry.source)
+            if opus_path:
+                return ffmpeg_source(discord.FFmpegOpusAudio, opus_path, codec='copy')
+            mp3_data = data if data is not None else await read_mp3(entry.source)
+            if mp3_data is None:
+                raise RuntimeError(f"could not download {entry.source}")
+            return audio_from_bytes(mp3_data)
 
     try:
-        voice_client.play(discord.FFmpegPCMAudio(source_file))
-        await interaction.followup.send(f"Speaking: `{spoken_text}`")
+        position = enqueue_items(interaction.guild, [QueueItem(entry.title, load_audio)], interaction.extras.get('received_at'))
+        await interaction.followup.send(describe_position("Playing", entry.title, position))
+    except asyncio.QueueFull:
+        await interaction.followup.send("The playback queue is full. Try again in a bit.")
     except Exception as e:
         logging.error(f"Playback Error: {e}")
         await interaction.followup.send("An error occurred while trying to play the audio.")
@@ -336,74 +836,135 @@ async def searchsound(interaction: discord.Interaction, query: str):
         await interaction.response.send_message("You are not authorized to use this command.", ephemeral=True)
         return
 
+    # Sounds picked from autocomplete are already known, so skip the search
+    if query.startswith(INDEX_CHOICE_PREFIX):
+        entry = sound_index.get(query[len(INDEX_CHOICE_PREFIX):])
+        if entry is None:
+            await interaction.response.send_message("That sound is no longer in the index. Please search for it again.", ephemeral=True)
+            return
+        await play_indexed_sound(interaction, entry)
+        return
+
     # Defer the response because search and download can take time
-    await interaction.response.defer()
+    with metrics.timed('defer'):
+        await interaction.response.defer()
 
     num_to_download = 3
-    # Use a unique ID for this specific interaction to manage temporary files
+    # Use a unique ID for this specific interaction to manage its sound files
     interaction_unique_id = str(uuid.uuid4())
-    temp_dir = os.path.join(DOWNLOAD_DIR, interaction_unique_id)
-    os.makedirs(temp_dir, exist_ok=True)
-    
-    found_sounds = search_myinstants_sounds(query, num_results=num_to_download)
+
+    found_sounds = await search_myinstants_sounds(query, num_results=num_to_download)
     downloaded_files_info = []
 
     if not found_sounds:
         await interaction.followup.send(f"No sounds found for '{query}'. Please try a different query.")
-        # Clean up empty temp directory
-        if os.path.exists(temp_dir) and not os.listdir(temp_dir):
-            os.rmdir(temp_dir)
         return
 
-    # 2. Download the top results
-    for i, sound in enumerate(found_sounds):
-        # Create a safe filename for the downloaded MP3
-        safe_title = "".join(c if c.isalnum() or c in [' ', '_', '-'] else '' for c in sound['title']).strip()
-        filename = f"{safe_title[:40].replace(' ', '_')}_{i+1}.mp3" # Limit title length for filename
+    # Remember what we found so it shows up in autocomplete next time
+    for sound in found_sounds:
+        sound_index.add_myinstants(sound['title'], sound['mp3_url'])
+
+    if SEARCH_STREAM_PLAYBACK:
+        # Nothing is downloaded up front; buttons stream their sound when pressed
+        downloaded_files_info = [{
+            'title': sound['title'],
+            'path': acquire_cached_mp3(sound['mp3_url']),
+            'mp3_url': sound['mp3_url'],
+            'unique_id': interaction_unique_id
+        } for sound in found_sounds]
+        session = bot.sound_sessions.create(interaction_unique_id, str(interaction.user.id), downloaded_files_info)
+
+        view = SoundButtonView(downloaded_files_info, str(interaction.user.id))
+        message_content = f"Here are the top {len(downloaded_files_info)} sounds for '{query}':"
+        response_message = await interaction.followup.send(message_content, view=view, wait=True)
+        view.message = response_message
+        bot.sound_sessions.bind_message(session, response_message.id)
+        return
+
+    # 2. Download the top results concurrently, capped per request
+    semaphore = asyncio.Semaphore(SEARCH_DOWNLOAD_CONCURRENCY)
 
-        # Download the MP3
-        logging.info(f"Attempting to download '{sound['title']}' to {os.path.join(temp_dir, filename)}")
-        file_path = download_mp3(sound['mp3_url'], filename, temp_dir)
+    async def download_sound(sound):
+        # Popular sounds come straight from the shared MP3 store
+        async with semaphore:
+            logging.info(f"Fetching '{sound['title']}' from {sound['mp3_url']}")
+            return sound, await fetch_mp3(sound['mp3_url'])
 
-        if file_path:
-            downloaded_files_info.append({
+    download_tasks = [asyncio.create_task(download_sound(sound)) for sound in found_sounds]
+
+    # Register a session for the downloaded files
+    # This allows the button callback to retrieve the file path later
+    session = bot.sound_sessions.create(interaction_unique_id, str(interaction.user.id), downloaded_files_info)
+    view = None
+    response_message = None
+    received = set()
+
+    # 3. Send buttons as soon as the first download lands, then add the rest as they arrive
+    try:
+        for next_download in asyncio.as_completed(download_tasks, timeout=SEARCH_DOWNLOAD_DEADLINE):
+            sound, file_path = await next_download
+            received.add(id(sound))
+            if not file_path:
+                logging.warning(f"Failed to download sound: {sound['title']} from {sound['mp3_url']}")
+                continue
+
+            sound_info = {
                 'title': sound['title'],
                 'path': file_path,
-                'unique_id': interaction_unique_id, # Store this for button callback
-                'message_id': None # Placeholder, will be filled after sending message
-            })
-        else:
-            logging.warning(f"Failed to download sound: {sound['title']} from {sound['mp3_url']}")
+                'mp3_url': sound['mp3_url'],
+                'unique_id': interaction_unique_id # Store this for button callback
+            }
+            downloaded_files_info.append(sound_info)
+            bot.sound_sessions.update(session)
+            opus_sounds.schedule(sound['mp3_url'], file_path)
+
+            if view is None:
+                view = SoundButtonView(downloaded_files_info, str(interaction.user.id))
+                response_message = await interaction.followup.send(f"Found sounds for '{query}', more on the way...", view=view, wait=True)
+                view.message = response_message # Store message reference for cleanup/timeout
+                bot.sound_sessions.bind_message(session, response_message.id)
+            else:
+                view.add_sound_button(len(downloaded_files_info) - 1, sound_info)
+                await response_message.edit(view=view)
+    except asyncio.TimeoutError:
+        logging.warning(f"Download deadline of {SEARCH_DOWNLOAD_DEADLINE}s hit for query '{query}'")
+    finally:
+        for task in download_tasks:
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled() and task.exception() is None:
+                # Finished right at the deadline; hand back the reference we never used
+                sound, file_path = task.result()
+                if file_path and id(sound) not in received:
+                    release_mp3(sound['mp3_url'])
 
     if not downloaded_files_info:
+        bot.sound_sessions.remove(interaction_unique_id)
         await interaction.followup.send(f"Found sounds for '{query}', but failed to download any. Please try again later or with a different query.")
-        # Clean up empty temp directory
-        if os.path.exists(temp_dir) and not os.listdir(temp_dir):
-            os.rmdir(temp_dir)
         return
 
-    # Store the downloaded file info in the bot's temporary storage
-    # This allows the button callback to retrieve the file path later
-    bot.temp_sound_files[interaction_unique_id] = downloaded_files_info
-
-    # 3. Create and send buttons
-    view = SoundButtonView(downloaded_files_info, str(interaction.user.id))
     message_content = f"Here are the top {len(downloaded_files_info)} sounds for '{query}':"
-    response_message = await interaction.followup.send(message_content, view=view)
-    view.message = response_message # Store message reference for cleanup/timeout
+    await response_message.edit(content=message_content, view=view)
 
-    # Update message_id in stored sound info
-    for sound in downloaded_files_info:
-        sound['message_id'] = response_message.id
-
-    # Schedule cleanup for temp files after the view times out or is explicitly stopped
+    # Release the sound files after the view times out or is explicitly stopped
     # The cleanup is handled by the View's on_timeout and disconnect_button now
 
+@searchsound.autocomplete('query')
+async def searchsound_autocomplete(interaction: discord.Interaction, current: str):
+    # Known sounds play directly when picked; typing anything else still searches myinstants
+    return [
+        app_commands.Choice(name=entry.title[:100], value=f"{INDEX_CHOICE_PREFIX}{entry.id}")
+        for entry in sound_index.search(current)
+    ]
+
 
 # --- Main Execution ---
 if __name__ == "__main__":
     # Start the Flask server in a separate thread to handle web requests
-    start_server_thread()
+    # (with HEALTH_SERVER=async it is started on the bot's event loop in setup_hook instead)
+    if HEALTH_SERVER == 'flask':
+        start_server_thread()
+    startup.mark('init')
     
     # Start the Discord bot in the main thread
     try:
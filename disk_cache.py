@@ -0,0 +1,186 @@
+# disk_cache.py
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+
+def make_key(*parts):
+    """
+    Builds a content address from the given parts. Order matters, so callers
+    should always pass the same fields in the same order.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(repr(part).encode('utf-8'))
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+
+class DiskCache:
+    """
+    A persistent key -> file cache with LRU eviction.
+
+    Entries live as `<key><suffix>` files inside `directory`, so the cache
+    survives restarts. Recency is tracked in memory and seeded from file
+    mtimes on startup. Either budget can be set to 0 to disable it.
+
+    Entries can be pinned with acquire()/release(); a pinned entry is never
+    evicted, so files that are still referenced stay on disk.
+    """
+
+    def __init__(self, directory, max_bytes=0, max_entries=0, suffix=".mp3"):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.suffix = suffix
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> size in bytes, oldest first
+        self._pins = {}  # key -> reference count
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        found = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.tmp'):
+                # Left behind by a write that was interrupted; reclaim the space
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+                continue
+            if not name.endswith(self.suffix):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            found.append((stat.st_mtime, name[:-len(self.suffix)], stat.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._total_bytes += size
+        self._evict()
+        logging.info(f"Loaded {len(self._entries)} cached files ({self._total_bytes} bytes) from {self.directory}")
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def path_for(self, key):
+        return os.path.join(self.directory, key + self.suffix)
+
+    def get(self, key):
+        """
+        Returns the path of the cached file for `key`, or None on a miss.
+        """
+        return self._lookup(key, pin=False)
+
+    def acquire(self, key):
+        """
+        Like get(), but also takes a reference on the entry so it cannot be
+        evicted until release() is called.
+        """
+        return self._lookup(key, pin=True)
+
+    def _lookup(self, key, pin):
+        with self._lock:
+            if key not in self._entries or not os.path.exists(self.path_for(key)):
+                if key in self._entries:
+                    self._total_bytes -= self._entries.pop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            if pin:
+                self._pins[key] = self._pins.get(key, 0) + 1
+        try:
+            os.utime(self.path_for(key))
+        except OSError:
+            pass
+        return self.path_for(key)
+
+    def release(self, key):
+        with self._lock:
+            count = self._pins.get(key, 0) - 1
+            if count > 0:
+                self._pins[key] = count
+            else:
+                self._pins.pop(key, None)
+            self._evict()
+
+    def read(self, key):
+        """
+        Returns the cached bytes for `key`, or None on a miss. The bytes are a
+        private copy, so an eviction afterwards cannot affect the caller.
+        """
+        path = self.get(key)
+        if path is None:
+            return None
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put(self, key, data):
+        """
+        Stores `data` under `key` and returns the path of the cached file.
+        The write goes through a temporary file so readers never see a
+        partially written entry.
+        """
+        path = self.path_for(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            if key in self._entries:
+                self._total_bytes -= self._entries.pop(key)
+            self._entries[key] = len(data)
+            self._total_bytes += len(data)
+            self._evict()
+        return path
+
+    def _evict(self):
+        # Caller holds the lock (or we are still in __init__).
+        # The newest entry is always kept, so a fresh put() is never evicted by
+        # itself when pinned entries are holding the cache over budget.
+        if not self._over_budget():
+            return
+        for key in list(self._entries)[:-1]:
+            if not self._over_budget():
+                break
+            if key in self._pins:
+                continue
+            self._total_bytes -= self._entries.pop(key)
+            self.evictions += 1
+            try:
+                os.remove(self.path_for(key))
+            except OSError:
+                pass
+
+    def _over_budget(self):
+        if self.max_entries and len(self._entries) > self.max_entries:
+            return True
+        if self.max_bytes and self._total_bytes > self.max_bytes:
+            return True
+        return False
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+                'pinned': len(self._pins),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': (self.hits / lookups) if lookups else 0.0,
+            }
@@ -0,0 +1,58 @@
+# guild_settings.py
+import asyncio
+import json
+import logging
+import os
+
+
+class GuildSettings:
+    """
+    Small per-guild settings (like the /ttsengine choice) saved to a JSON file
+    at `path`, so they survive restarts.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._settings = {}  # guild id -> {setting name: value}
+        self._lock = asyncio.Lock()
+        if path:
+            self._load()
+
+    def get(self, guild_id, name, default=None):
+        return self._settings.get(guild_id, {}).get(name, default)
+
+    async def set(self, guild_id, name, value):
+        self._settings.setdefault(guild_id, {})[name] = value
+        if not self.path:
+            return
+        # One write at a time, so an older snapshot never lands after a newer one
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self._write, self._snapshot())
+
+    def _load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                guilds = json.load(f).get('guilds', {})
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logging.warning(f"Could not load guild settings from {self.path}: {e}")
+            return
+        # JSON object keys are strings; guild ids are ints everywhere else
+        self._settings = {int(guild_id): dict(settings) for guild_id, settings in guilds.items()}
+        logging.info(f"Loaded settings for {len(self._settings)} guilds from {self.path}")
+
+    def _snapshot(self):
+        return {str(guild_id): dict(settings) for guild_id, settings in self._settings.items()}
+
+    def _write(self, guilds):
+        # The write goes through a temporary file so a crash never leaves a truncated file
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'guilds': guilds}, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logging.warning(f"Could not save guild settings to {self.path}: {e}")
@@ -0,0 +1,90 @@
+# health_server.py
+import logging
+import math
+
+from aiohttp import web
+
+
+def health_status(bot, loop_monitor, max_loop_lag=1.0):
+    """
+    Liveness: the process is up and the event loop is not stuck.
+    Returns (ok, details).
+    """
+    last_lag = loop_monitor.last_lag
+    ok = not bot.is_closed() and last_lag < max_loop_lag
+    return ok, {
+        'closed': bot.is_closed(),
+        'loop_lag_ms': round(last_lag * 1000, 1),
+    }
+
+
+def readiness_status(bot):
+    """
+    Readiness: logged in, the gateway is connected and answering heartbeats,
+    and every voice connection we hold is actually connected.
+    Returns (ok, details).
+    """
+    latency = bot.latency
+    gateway_ok = bot.is_ready() and not bot.is_closed() and bot.ws is not None and math.isfinite(latency)
+    voice_clients = list(bot.voice_clients)
+    broken = [vc.guild.id for vc in voice_clients if not vc.is_connected()]
+    return gateway_ok and not broken, {
+        'ready': bot.is_ready(),
+        'gateway_latency_ms': round(latency * 1000, 1) if math.isfinite(latency) else None,
+        'voice_connected': len(voice_clients) - len(broken),
+        'voice_broken': broken,
+    }
+
+
+class HealthServer:
+    """
+    Answers keep-alive pings, health and readiness checks and /metrics from
+    aiohttp on the bot's own event loop, instead of a Flask server thread.
+    """
+
+    def __init__(self, bot, loop_monitor, port=8080, host='0.0.0.0', render_metrics=None):
+        self.bot = bot
+        self.loop_monitor = loop_monitor
+        self.port = port
+        self.host = host
+        self.render_metrics = render_metrics
+        self._runner = None
+
+    def _make_app(self):
+        app = web.Application()
+        app.router.add_get('/', self.home)
+        app.router.add_get('/wakeup', self.wakeup)
+        app.router.add_get('/healthz', self.healthz)
+        app.router.add_get('/readyz', self.readyz)
+        if self.render_metrics:
+            app.router.add_get('/metrics', self.metrics)
+        return app
+
+    async def start(self):
+        self._runner = web.AppRunner(self._make_app(), access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logging.info(f"Health server listening on {self.host}:{self.port} (async)")
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def home(self, request):
+        return web.Response(text="HindiBot is alive!")
+
+    async def wakeup(self, request):
+        return web.Response(text="Server is awake and responding.")
+
+    async def healthz(self, request):
+        ok, details = health_status(self.bot, self.loop_monitor)
+        return web.json_response(details, status=200 if ok else 503)
+
+    async def readyz(self, request):
+        ok, details = readiness_status(self.bot)
+        return web.json_response(details, status=200 if ok else 503)
+
+    async def metrics(self, request):
+        # Prometheus text exposition format
+        return web.Response(body=self.render_metrics().encode(), headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'})
@@ -0,0 +1,218 @@
+# metrics.py
+import threading
+import time
+from contextlib import contextmanager
+
+# Buckets in seconds, from a fast cache hit to a slow TTS round trip.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """
+    A monotonically increasing count, optionally split by labels.
+    """
+
+    kind = 'counter'
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield self.name + _format_labels(self.labels, key), value
+
+
+class Histogram:
+    """
+    Counts observations into cumulative buckets, Prometheus style.
+    Observations may come from any thread.
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self):
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+        for key, values in sorted(series.items()):
+            for bound, count in zip(self.buckets, values):
+                yield self.name + '_bucket' + _format_labels(self.labels, key, [('le', _format_value(float(bound)))]), count
+            yield self.name + '_bucket' + _format_labels(self.labels, key, [('le', '+Inf')]), values[-1]
+            yield self.name + '_sum' + _format_labels(self.labels, key), values[-2]
+            yield self.name + '_count' + _format_labels(self.labels, key), values[-1]
+
+
+class Registry:
+    """
+    Collects metrics and renders them in the Prometheus text format.
+
+    Besides Counters and Histograms, any component with a stats() dict can be
+    exported with add_stats(); each numeric entry becomes a gauge.
+    """
+
+    def __init__(self, prefix='hindibot'):
+        self.prefix = prefix
+        self._metrics = []
+        self._stats = []  # (name, help, stats function)
+
+    def counter(self, name, help, labels=()):
+        metric = Counter(f"{self.prefix}_{name}", help, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(f"{self.prefix}_{name}", help, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def add_stats(self, name, help, stats_fn):
+        self._stats.append((f"{self.prefix}_{name}", help, stats_fn))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(f"{sample} {_format_value(value)}" for sample, value in metric.samples())
+        for name, help, stats_fn in self._stats:
+            try:
+                stats = stats_fn()
+            except Exception:
+                # Stats are read from the web server's thread; skip a component caught mid-update
+                continue
+            for key, value in stats.items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                lines.append(f"# HELP {name}_{key} {help}: {key}")
+                lines.append(f"# TYPE {name}_{key} gauge")
+                lines.append(f"{name}_{key} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+STAGE_SECONDS = registry.histogram(
+    'stage_seconds',
+    "Time spent in each stage of handling a command",
+    labels=('stage',),
+)
+INTERACTIONS = registry.counter(
+    'interactions_total',
+    "Interactions received, by guild and command",
+    labels=('guild', 'command'),
+)
+PLAYS = registry.counter(
+    'plays_total',
+    "Clips that started playing, by guild",
+    labels=('guild',),
+)
+TTS_REQUESTS = registry.counter(
+    'tts_requests_total',
+    "TTS requests by engine and whether the cache answered",
+    labels=('engine', 'result'),
+)
+DOWNLOADS = registry.counter(
+    'downloads_total',
+    "myinstants MP3 downloads by result",
+    labels=('result',),
+)
+LOOP_LAG = registry.histogram(
+    'event_loop_lag_seconds',
+    "How late the event loop woke up from a short sleep",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+
+
+def observe_stage(stage, seconds):
+    STAGE_SECONDS.observe(seconds, stage=stage)
+
+
+def timed(stage):
+    """
+    Context manager that records how long its block took under `stage`.
+    """
+    return STAGE_SECONDS.time(stage=stage)
+
+
+class StartupTimer:
+    """
+    Records named checkpoints between process start and the bot being ready.
+    stats() gives the time spent in each step, in milliseconds.
+    """
+
+    def __init__(self, started=None):
+        self.started = started if started is not None else time.perf_counter()
+        self.marks = []
+
+    def mark(self, step):
+        self.marks.append((step, time.perf_counter()))
+
+    def __contains__(self, step):
+        return any(name == step for name, _ in self.marks)
+
+    def stats(self):
+        stats = {}
+        previous = self.started
+        for step, at in self.marks:
+            stats[f'{step}_ms'] = (at - previous) * 1000
+            previous = at
+        stats['total_ms'] = (previous - self.started) * 1000
+        return stats
+
+    def summary(self):
+        return ", ".join(f"{key[:-3]} {value:.0f}ms" for key, value in self.stats().items())
@@ -0,0 +1,105 @@
+# opus_transcode.py
+import asyncio
+import logging
+import time
+
+from disk_cache import DiskCache, make_key
+from singleflight import SingleFlight
+
+# Same encoder settings discord.FFmpegOpusAudio uses, so the output can be sent as-is.
+FFMPEG_OPUS_ARGS = [
+    '-map_metadata', '-1',
+    '-f', 'opus',
+    '-c:a', 'libopus',
+    '-ar', '48000',
+    '-ac', '2',
+    '-b:a', '128k',
+    '-application', 'audio',
+    '-loglevel', 'warning',
+]
+
+# Single-pass EBU R128 normalization, so clips from different uploaders play at a similar level.
+LOUDNORM_FILTER = 'loudnorm=I=-16:TP=-1.5:LRA=11'
+
+
+async def encode_opus(path, normalize=True):
+    """
+    Runs FFmpeg once over `path` and returns Ogg Opus bytes.
+    """
+    filters = ['-af', LOUDNORM_FILTER] if normalize else []
+    process = await asyncio.create_subprocess_exec(
+        'ffmpeg', '-i', path, *filters, *FFMPEG_OPUS_ARGS, 'pipe:1',
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    stdout, stderr = await process.communicate()
+    if process.returncode != 0:
+        raise RuntimeError(f"ffmpeg exited with {process.returncode}: {stderr.decode(errors='replace').strip()}")
+    return stdout
+
+
+class OpusTranscoder:
+    """
+    Converts downloaded sounds to normalized Ogg Opus files in the background,
+    once per sound. Playback can then pass the Opus packets straight through
+    instead of decoding to PCM and re-encoding on every play.
+    """
+
+    def __init__(self, directory, max_bytes=0, concurrency=2, normalize=True):
+        self.cache = DiskCache(directory, max_bytes=max_bytes, suffix='.ogg')
+        self.concurrency = concurrency
+        self.normalize = normalize
+        self._semaphore = None
+        self._flights = SingleFlight('transcode')
+        self._tasks = set()
+        self.transcoded = 0
+        self.failures = 0
+        self.total_time = 0.0
+
+    def get(self, mp3_url):
+        """
+        Returns the path of the transcoded file for mp3_url, or None if it
+        has not been transcoded yet.
+        """
+        return self.cache.get(make_key('opus', mp3_url))
+
+    def schedule(self, mp3_url, src_path):
+        """
+        Queues a background transcode of src_path unless one already exists
+        or is running. Must be called from the event loop.
+        """
+        key = make_key('opus', mp3_url)
+        if key in self.cache:
+            return
+        task = asyncio.ensure_future(self._flights.do(key, self._transcode, key, src_path))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _transcode(self, key, src_path):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        async with self._semaphore:
+            started = time.perf_counter()
+            try:
+                data = await encode_opus(src_path, normalize=self.normalize)
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(None, self.cache.put, key, data)
+            except Exception as e:
+                self.failures += 1
+                logging.error(f"Opus transcode of {src_path} failed: {e}")
+                return
+            elapsed = time.perf_counter() - started
+            self.transcoded += 1
+            self.total_time += elapsed
+            logging.info(f"Transcoded {src_path} to Opus in {elapsed * 1000:.0f}ms")
+
+    def stats(self):
+        stats = self.cache.stats()
+        stats.update({
+            'transcoded': self.transcoded,
+            'failures': self.failures,
+            'pending': len(self._tasks),
+            'avg_transcode_ms': (self.total_time / self.transcoded * 1000) if self.transcoded else 0.0,
+        })
+        return stats
@@ -1,42 +1,253 @@
 # sound_scraper.py
-import requests
-from bs4 import BeautifulSoup
+import asyncio
+import aiohttp
+import codecs
+import importlib.util
 import os
+import queue
+import time
+from collections import OrderedDict
+from html.parser import HTMLParser
 from urllib.parse import quote_plus
+from disk_cache import DiskCache, make_key
+from singleflight import SingleFlight
+import metrics
 
 BASE_URL = "https://www.myinstants.com"
 # DOWNLOAD_DIR will be managed by the Discord bot, so it's not strictly needed here,
 # but can be kept for consistency if this file might be run standalone.
 # For the bot, we'll pass a specific download path.
 
-def get_html_from_url(url):
+# Search results are cached per query for a while, and downloaded MP3s are kept
+# in a content-addressed store so popular sounds are only fetched once.
+SEARCH_CACHE_TTL = float(os.environ.get('SEARCH_CACHE_TTL', 600))
+SEARCH_CACHE_MAX_ENTRIES = int(os.environ.get('SEARCH_CACHE_MAX_ENTRIES', 500))
+MP3_STORE_DIR = os.environ.get('MP3_STORE_DIR', './sounds/store/')
+MP3_STORE_MAX_BYTES = int(os.environ.get('MP3_STORE_MAX_BYTES', 500 * 1024 * 1024))
+
+# How search pages are parsed:
+#   'stream'   - incremental parser fed straight from the HTTP response; stops
+#                reading the page once num_results sounds have been found
+#   'strainer' - BeautifulSoup limited to instants_container (uses lxml if installed)
+#   'full'     - BeautifulSoup over the whole page (the original behaviour)
+SEARCH_PARSER = os.environ.get('SEARCH_PARSER', 'stream')
+
+# BeautifulSoup (and lxml) are only imported when a BeautifulSoup mode is used,
+# so the default stream parser keeps them out of startup entirely
+STRAINER_BACKEND = 'lxml' if importlib.util.find_spec('lxml') else 'html.parser'
+
+class TTLCache:
+  """
+  A small in-memory cache whose entries expire after `ttl` seconds.
+  The oldest entries are dropped once `max_entries` is reached.
+  """
+  def __init__(self, ttl, max_entries):
+    self.ttl = ttl
+    self.max_entries = max_entries
+    self.hits = 0
+    self.misses = 0
+    self._entries = OrderedDict() # key -> (expires_at, value)
+
+  def get(self, key):
+    entry = self._entries.get(key)
+    if entry is None or entry[0] < time.monotonic():
+      self._entries.pop(key, None)
+      self.misses += 1
+      return None
+    self.hits += 1
+    return entry[1]
+
+  def set(self, key, value):
+    self._entries.pop(key, None)
+    self._entries[key] = (time.monotonic() + self.ttl, value)
+    while len(self._entries) > self.max_entries:
+      self._entries.popitem(last=False)
+
+  def stats(self):
+    return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+search_cache = TTLCache(SEARCH_CACHE_TTL, SEARCH_CACHE_MAX_ENTRIES)
+# Identical searches and downloads that are already running are shared, not repeated
+search_flights = SingleFlight('search')
+download_flights = SingleFlight('download')
+_mp3_store = None
+
+def get_mp3_store():
+  """
+  Returns the shared MP3 store, creating it on first use.
+  """
+  global _mp3_store
+  if _mp3_store is None:
+    _mp3_store = DiskCache(MP3_STORE_DIR, max_bytes=MP3_STORE_MAX_BYTES)
+  return _mp3_store
+
+# A single pooled session is shared by every request, so connections to
+# myinstants stay alive between searches and downloads.
+_session = None
+
+def get_session():
+  """
+  Returns the shared aiohttp session, creating it on first use.
+  """
+  global _session
+  if _session is None or _session.closed:
+    connector = aiohttp.TCPConnector(limit=20, limit_per_host=10, ttl_dns_cache=300)
+    timeout = aiohttp.ClientTimeout(total=20, sock_connect=5)
+    _session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+  return _session
+
+async def close_session():
+  global _session
+  if _session is not None and not _session.closed:
+    await _session.close()
+  _session = None
+
+async def get_html_from_url(url):
   """
   Fetches the HTML content from a given URL.
   """
   try:
-    response = requests.get(url)
-    response.raise_for_status()
-    return response.text
-  except requests.exceptions.RequestException as e:
+    async with get_session().get(url) as response:
+      response.raise_for_status()
+      return await response.text()
+  except (aiohttp.ClientError, asyncio.TimeoutError) as e:
     print(f"Error fetching URL {url}: {e}")
     return None
 
-def search_myinstants_sounds(query, num_results=3):
+def mp3_url_from_onclick(onclick_attr):
   """
-  Searches Myinstants.com for sounds based on a query and returns a list
-  of sound titles and their direct MP3 URLs, limited by num_results.
+  Pulls the MP3 URL out of a button's onclick="play('/media/sounds/...', ...)".
   """
-  encoded_query = quote_plus(query)
-  search_url = f"{BASE_URL}/en/search/?name={encoded_query}"
+  try:
+    start_index = onclick_attr.find("play('") + len("play('")
+    end_index = onclick_attr.find("'", start_index)
+    relative_mp3_path = onclick_attr[start_index:end_index]
+    return BASE_URL + relative_mp3_path
+  except Exception: # Removed detailed error logging here, Discord bot will handle it
+    return None
 
-  # print(f"Searching Myinstants for: '{query}' at {search_url}") # Moved logging to Discord bot
+def _sounds_from_instant_divs(instant_divs, num_results):
+  sounds_found = []
+  for instant_div in instant_divs:
+    if len(sounds_found) >= num_results:
+        break
 
-  html_content = get_html_from_url(search_url)
-  if not html_content:
-    return []
+    title_tag = instant_div.find('a', class_='instant-link')
+    title = title_tag.get_text(strip=True) if title_tag else "Unknown Title"
+
+    button_tag = instant_div.find('button', class_='small-button')
+    mp3_url = None
+    if button_tag and 'onclick' in button_tag.attrs:
+      mp3_url = mp3_url_from_onclick(button_tag['onclick'])
+
+    if mp3_url:
+      sounds_found.append({
+          'title': title,
+          'mp3_url': mp3_url
+      })
+  return sounds_found
+
+class InstantExtractor(HTMLParser):
+  """
+  Incremental parser for search pages. Feed it chunks as they arrive; it
+  collects sounds from the instant divs and sets `done` once it has
+  num_results of them, after which further input is ignored.
+  """
+  def __init__(self, num_results=3):
+    super().__init__()
+    self.num_results = num_results
+    self.sounds_found = []
+    self.done = False
+    self._container_depth = 0 # div nesting depth inside instants_container
+    self._depth = 0 # div nesting depth inside the current instant
+    self._title_parts = None
+    self._in_title = False
+    self._mp3_url = None
+
+  def feed(self, data):
+    if not self.done:
+      super().feed(data)
+
+  def handle_starttag(self, tag, attrs):
+    if self.done:
+      return
+    attrs = dict(attrs)
+    classes = (attrs.get('class') or '').split()
+    if tag == 'div':
+      if self._container_depth:
+        self._container_depth += 1
+      if self._depth:
+        self._depth += 1
+      elif not self._container_depth and attrs.get('id') == 'instants_container':
+        self._container_depth = 1
+      elif self._container_depth and 'instant' in classes:
+        self._depth = 1
+        self._title_parts = None
+        self._mp3_url = None
+    elif not self._depth:
+      return
+    elif tag == 'a' and 'instant-link' in classes and self._title_parts is None:
+      self._title_parts = []
+      self._in_title = True
+    elif tag == 'button' and 'small-button' in classes and self._mp3_url is None and attrs.get('onclick'):
+      self._mp3_url = mp3_url_from_onclick(attrs['onclick'])
+
+  def handle_endtag(self, tag):
+    if self.done:
+      return
+    if tag == 'div' and self._container_depth:
+      # Instants after the container closes (sidebars and the like) are not results
+      self._container_depth -= 1
+    if not self._depth:
+      return
+    if tag == 'a':
+      self._in_title = False
+    elif tag == 'div':
+      self._depth -= 1
+      if not self._depth:
+        self._finish_instant()
+
+  def handle_data(self, data):
+    if self._in_title:
+      self._title_parts.append(data)
+
+  def _finish_instant(self):
+    if self._mp3_url:
+      # Matches BeautifulSoup's get_text(strip=True)
+      title = "".join(part.strip() for part in self._title_parts or []) or "Unknown Title"
+      self.sounds_found.append({
+          'title': title,
+          'mp3_url': self._mp3_url
+      })
+    self._in_title = False
+    if len(self.sounds_found) >= self.num_results:
+      self.done = True
+
+def parse_search_results(html_content, num_results=3, parser=None):
+  """
+  Extracts up to num_results sounds (title and MP3 URL) from a search page.
+  `parser` is one of the SEARCH_PARSER modes and defaults to that setting.
+  """
+  parser = parser or SEARCH_PARSER
+
+  if parser == 'stream':
+    # Feed in chunks so parsing stops as soon as enough sounds are found
+    extractor = InstantExtractor(num_results)
+    for offset in range(0, len(html_content), 16384):
+      extractor.feed(html_content[offset:offset + 16384])
+      if extractor.done:
+        break
+    return extractor.sounds_found
+
+  from bs4 import BeautifulSoup, SoupStrainer
+
+  if parser == 'strainer':
+    # Only instants_container is turned into a tree; the rest of the page is skipped
+    only_container = SoupStrainer('div', id='instants_container')
+    soup = BeautifulSoup(html_content, STRAINER_BACKEND, parse_only=only_container)
+    return _sounds_from_instant_divs(soup.find_all('div', class_='instant', limit=num_results * 2), num_results)
 
   soup = BeautifulSoup(html_content, 'html.parser')
-  sounds_found = []
 
   instants_container = soup.find('div', id='instants_container')
 
@@ -50,56 +261,182 @@ def search_myinstants_sounds(query, num_results=3):
       # print(f"No individual instant sound buttons found within 'instants_container' for query '{query}'.")
       return []
 
-  for instant_div in instant_divs:
-    if len(sounds_found) >= num_results:
-        break
+  return _sounds_from_instant_divs(instant_divs, num_results)
 
-    title_tag = instant_div.find('a', class_='instant-link')
-    title = title_tag.get_text(strip=True) if title_tag else "Unknown Title"
+async def _stream_search_results(url, num_results):
+  """
+  Parses a search page while it downloads and stops reading once enough
+  sounds are found, so most of the page never has to be transferred.
+  """
+  try:
+    async with get_session().get(url) as response:
+      response.raise_for_status()
+      decoder = codecs.getincrementaldecoder(response.charset or 'utf-8')(errors='replace')
+      extractor = InstantExtractor(num_results)
+      async for chunk in response.content.iter_chunked(16384):
+        extractor.feed(decoder.decode(chunk))
+        if extractor.done:
+          break
+      else:
+        extractor.feed(decoder.decode(b'', final=True))
+        extractor.close()
+      return extractor.sounds_found
+  except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+    print(f"Error fetching URL {url}: {e}")
+    return []
 
-    button_tag = instant_div.find('button', class_='small-button')
-    mp3_url = None
-    if button_tag and 'onclick' in button_tag.attrs:
-      onclick_attr = button_tag['onclick']
-      try:
-        start_index = onclick_attr.find("play('") + len("play('")
-        end_index = onclick_attr.find("'", start_index)
-        relative_mp3_path = onclick_attr[start_index:end_index]
-        mp3_url = BASE_URL + relative_mp3_path
-      except Exception: # Removed detailed error logging here, Discord bot will handle it
-        mp3_url = None
-    
-    if mp3_url:
-      sounds_found.append({
-          'title': title,
-          'mp3_url': mp3_url
-      })
+async def search_myinstants_sounds(query, num_results=3):
+  """
+  Searches Myinstants.com for sounds based on a query and returns a list
+  of sound titles and their direct MP3 URLs, limited by num_results.
+  """
+  cache_key = (query.strip().lower(), num_results)
+  cached = search_cache.get(cache_key)
+  if cached is None:
+    cached = await search_flights.do(cache_key, _search_uncached, query, num_results, cache_key)
+  return [dict(sound) for sound in cached]
+
+async def _search_uncached(query, num_results, cache_key):
+  encoded_query = quote_plus(query)
+  search_url = f"{BASE_URL}/en/search/?name={encoded_query}"
+
+  # print(f"Searching Myinstants for: '{query}' at {search_url}") # Moved logging to Discord bot
+
+  with metrics.timed('search'):
+    if SEARCH_PARSER == 'stream':
+      sounds_found = await _stream_search_results(search_url, num_results)
+    else:
+      html_content = await get_html_from_url(search_url)
+      if not html_content:
+        return []
+
+      # Parsing is CPU-bound, so keep it off the event loop
+      loop = asyncio.get_running_loop()
+      sounds_found = await loop.run_in_executor(None, parse_search_results, html_content, num_results)
+  if sounds_found:
+    search_cache.set(cache_key, sounds_found)
   return sounds_found
 
-def download_mp3(mp3_url, filename, save_dir): # filename is now mandatory
+async def fetch_mp3(mp3_url):
   """
-  Downloads an MP3 file from a given URL.
+  Returns a local path for the MP3 at mp3_url, downloading it into the shared
+  store only if it is not there yet. The caller holds a reference to the file
+  and must hand it back with release_mp3() when done.
   """
   if not mp3_url:
-    # print("MP3 URL is empty, cannot download.") # Logging moved to Discord bot
     return None
 
-  os.makedirs(save_dir, exist_ok=True)
-  file_path = os.path.join(save_dir, filename)
+  store = get_mp3_store()
+  key = make_key(mp3_url)
+  path = store.acquire(key)
+  if path:
+    return path
 
+  if not await download_flights.do(key, _download_to_store, mp3_url, key):
+    return None
+  # Take the reference only once we are back on the loop, so a cancelled
+  # download never leaves a reference behind. Every waiter takes its own.
+  return store.acquire(key)
+
+async def _download_to_store(mp3_url, key):
+  started = time.perf_counter()
   try:
-    # print(f"Downloading '{filename}' from {mp3_url}...") # Logging moved
-    response = requests.get(mp3_url, stream=True)
-    response.raise_for_status()
-
-    with open(file_path, 'wb') as f:
-      for chunk in response.iter_content(chunk_size=8192):
-        f.write(chunk)
-    # print(f"Successfully downloaded to: {file_path}") # Logging moved
-    return file_path
-  except requests.exceptions.RequestException as e:
+    async with get_session().get(mp3_url) as response:
+      response.raise_for_status()
+      data = await response.read()
+  except (aiohttp.ClientError, asyncio.TimeoutError) as e:
     # print(f"Error downloading {mp3_url}: {e}") # Logging moved
-    return None
-  except Exception as e:
-    # print(f"An unexpected error occurred while downloading {mp3_url}: {e}") # Logging moved
-    return None
\ No newline at end of file
+    metrics.DOWNLOADS.inc(result='error')
+    return False
+  metrics.observe_stage('download', time.perf_counter() - started)
+  metrics.DOWNLOADS.inc(result='ok')
+
+  loop = asyncio.get_running_loop()
+  try:
+    await loop.run_in_executor(None, get_mp3_store().put, key, data)
+  except OSError as e:
+    print(f"Error saving {mp3_url} to the MP3 store: {e}")
+    return False
+  return True
+
+def release_mp3(mp3_url):
+  """
+  Drops a reference taken by fetch_mp3(). The file stays cached until the
+  store needs the space.
+  """
+  get_mp3_store().release(make_key(mp3_url))
+
+def acquire_cached_mp3(mp3_url):
+  """
+  Returns the stored path for mp3_url with a reference taken, or None if it
+  has not been downloaded yet. Never touches the network.
+  """
+  return get_mp3_store().acquire(make_key(mp3_url))
+
+class Mp3Stream:
+  """
+  A blocking, file-like reader over an MP3 that is still downloading.
+  Chunks are pushed from the event loop and read from FFmpeg's pipe-writer
+  thread, so playback can start on the first chunk.
+  """
+  def __init__(self):
+    self._chunks = queue.Queue()
+    self._buffer = b''
+    self._eof = False
+
+  def feed(self, chunk):
+    self._chunks.put(chunk)
+
+  def finish(self):
+    self._chunks.put(None)
+
+  def read(self, size=-1):
+    while not self._eof and (size < 0 or len(self._buffer) < size):
+      chunk = self._chunks.get()
+      if chunk is None:
+        self._eof = True
+        break
+      self._buffer += chunk
+      if size >= 0:
+        break # Hand over what we have instead of waiting for a full block
+    if size < 0:
+      size = len(self._buffer)
+    data, self._buffer = self._buffer[:size], self._buffer[size:]
+    return data
+
+_stream_tasks = set()
+
+async def _pump_mp3(mp3_url, stream):
+  chunks = []
+  complete = False
+  try:
+    async with get_session().get(mp3_url) as response:
+      response.raise_for_status()
+      async for chunk in response.content.iter_chunked(8192):
+        stream.feed(chunk)
+        chunks.append(chunk)
+    complete = True
+  except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+    print(f"Error streaming {mp3_url}: {e}")
+  finally:
+    stream.finish()
+
+  # Keep a copy in the store so the next play does not need the network
+  if complete and chunks:
+    loop = asyncio.get_running_loop()
+    try:
+      await loop.run_in_executor(None, get_mp3_store().put, make_key(mp3_url), b''.join(chunks))
+    except OSError as e:
+      print(f"Error saving streamed {mp3_url} to the MP3 store: {e}")
+
+def stream_mp3(mp3_url):
+  """
+  Starts downloading mp3_url in the background and returns an Mp3Stream that
+  yields the bytes as they arrive. Must be called from the event loop.
+  """
+  stream = Mp3Stream()
+  task = asyncio.create_task(_pump_mp3(mp3_url, stream))
+  # Hold a reference so the download is not garbage collected mid-stream
+  _stream_tasks.add(task)
+  task.add_done_callback(_stream_tasks.discard)
+  return stream
@@ -0,0 +1,41 @@
+# singleflight.py
+import asyncio
+
+
+class SingleFlight:
+    """
+    Coalesces identical in-flight calls: while a call for a key is running,
+    later callers with the same key wait for it and share its result (or
+    exception) instead of starting their own.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0  # underlying calls actually made
+        self.shared = 0  # callers served by someone else's call
+        self._in_flight = {}
+
+    async def do(self, key, fn, *args):
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.shared += 1
+        else:
+            self.calls += 1
+            task = asyncio.ensure_future(fn(*args))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        # Shielded so one waiter giving up does not cancel the call for the others
+        return await asyncio.shield(task)
+
+    def _forget(self, key, task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            task.exception()  # Mark as retrieved; the waiters already saw it
+
+    def stats(self):
+        return {
+            'calls': self.calls,
+            'saved': self.shared,
+            'in_flight': len(self._in_flight),
+        }
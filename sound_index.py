@@ -0,0 +1,234 @@
+# sound_index.py
+import asyncio
+import bisect
+import heapq
+import json
+import logging
+import os
+import re
+import time
+from collections import OrderedDict
+from itertools import chain, islice
+
+from disk_cache import make_key
+
+_NON_WORD = re.compile(r'[\W_]+')
+
+
+def normalize(text):
+    return _NON_WORD.sub(' ', text.lower()).strip()
+
+
+def _trigrams(word):
+    return {word[i:i + 3] for i in range(len(word) - 2)}
+
+
+class SoundEntry:
+    __slots__ = ('id', 'title', 'kind', 'source', 'norm', 'words')
+
+    def __init__(self, id, title, kind, source):
+        self.id = id
+        self.title = title
+        self.kind = kind  # 'special' (bundled clip, source is its name) or 'myinstants' (source is the MP3 URL)
+        self.source = source
+        self.norm = ' '.join(normalize(title).split())
+        self.words = self.norm.split()
+
+
+class SoundIndex:
+    """
+    An in-memory index over the bundled clips and every myinstants sound the
+    bot has seen, for autocomplete and for playing known sounds without a search.
+
+    Each query word matches the start of a title word (short words, via a
+    sorted word list) or anywhere inside one (three letters or more, via a
+    trigram index). myinstants titles and URLs are saved to `path` so the
+    index survives restarts.
+    """
+
+    def __init__(self, path=None, max_entries=10000, save_interval=30):
+        self.path = path
+        self.max_entries = max_entries
+        self.save_interval = save_interval
+        self._entries = OrderedDict()  # id -> SoundEntry, oldest myinstants sounds first
+        self._grams = {}  # trigram -> ids of entries with a word containing it
+        self._words = []  # sorted (word, id) pairs for prefix lookups
+        self._specials = []  # bundled clips, which are never evicted
+        self._dirty = False
+        self._task = None
+        self.searches = 0
+        self.total_search = 0.0
+        if path:
+            self._load()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, entry_id):
+        return self._entries.get(entry_id)
+
+    def add_special(self, name):
+        entry = SoundEntry(f"special:{name}", name, 'special', name)
+        if entry.id not in self._entries:
+            self._specials.append(entry)
+        self._add(entry)
+
+    def add_myinstants(self, title, mp3_url):
+        entry_id = make_key(mp3_url)[:16]
+        existing = self._entries.get(entry_id)
+        if existing is not None and existing.title == title:
+            self._entries.move_to_end(entry_id)
+            return existing
+        entry = SoundEntry(entry_id, title, 'myinstants', mp3_url)
+        self._add(entry)
+        self._dirty = True
+        return entry
+
+    def _add(self, entry):
+        if entry.id in self._entries:
+            self._remove(entry.id)
+        self._entries[entry.id] = entry
+        for word in set(entry.words):
+            bisect.insort(self._words, (word, entry.id))
+            for gram in _trigrams(word):
+                self._grams.setdefault(gram, set()).add(entry.id)
+        while len(self._entries) > self.max_entries:
+            oldest = next((entry_id for entry_id, e in self._entries.items() if e.kind == 'myinstants'), None)
+            if oldest is None:
+                break
+            self._remove(oldest)
+
+    def _remove(self, entry_id):
+        entry = self._entries.pop(entry_id)
+        for word in set(entry.words):
+            index = bisect.bisect_left(self._words, (word, entry_id))
+            if index < len(self._words) and self._words[index] == (word, entry_id):
+                del self._words[index]
+            for gram in _trigrams(word):
+                ids = self._grams.get(gram)
+                if ids is not None:
+                    ids.discard(entry_id)
+                    if not ids:
+                        del self._grams[gram]
+
+    def _prefix_ids(self, prefix):
+        start = bisect.bisect_left(self._words, (prefix,))
+        ids = set()
+        for word, entry_id in islice(self._words, start, None):
+            if not word.startswith(prefix):
+                break
+            ids.add(entry_id)
+        return ids
+
+    def _infix_ids(self, token):
+        postings = sorted((self._grams.get(gram, set()) for gram in _trigrams(token)), key=len)
+        ids = set(postings[0]).intersection(*postings[1:])
+        return {entry_id for entry_id in ids if any(token in word for word in self._entries[entry_id].words)}
+
+    def search(self, query, limit=25, kind=None):
+        """
+        Returns up to `limit` entries matching every word of `query`, best
+        matches first: exact title, then title prefix, then word prefix.
+        `kind` limits the results to 'special' or 'myinstants' sounds.
+        """
+        started = time.perf_counter()
+        tokens = normalize(query).split()
+        if not tokens:
+            # Nothing typed yet: bundled clips first, then the most recently seen sounds
+            specials = self._specials if kind != 'myinstants' else []
+            recent = (e for e in reversed(self._entries.values()) if e.kind == 'myinstants') if kind != 'special' else ()
+            return self._timed(started, list(islice(chain(specials, recent), limit)))
+
+        ids = None
+        for token in tokens:
+            matches = self._prefix_ids(token) if len(token) < 3 else self._infix_ids(token)
+            ids = matches if ids is None else ids & matches
+            if not ids:
+                return self._timed(started, [])
+
+        joined = ' '.join(tokens)
+        word_starts = [' ' + token for token in tokens]
+
+        def rank(entry):
+            padded = ' ' + entry.norm
+            return (
+                entry.norm != joined,
+                not entry.norm.startswith(joined),
+                not all(start in padded for start in word_starts),
+                entry.kind != 'special',
+                len(entry.norm),
+            )
+
+        candidates = (self._entries[entry_id] for entry_id in ids)
+        if kind is not None:
+            candidates = (entry for entry in candidates if entry.kind == kind)
+        return self._timed(started, heapq.nsmallest(limit, candidates, key=rank))
+
+    def _timed(self, started, results):
+        self.searches += 1
+        self.total_search += time.perf_counter() - started
+        return results
+
+    def _load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                sounds = json.load(f).get('sounds', [])
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logging.warning(f"Could not load the sound index from {self.path}: {e}")
+            return
+        for sound in sounds:
+            self.add_myinstants(sound['title'], sound['mp3_url'])
+        self._dirty = False
+        logging.info(f"Loaded {len(sounds)} sounds into the sound index from {self.path}")
+
+    def _snapshot(self):
+        # Taken on the event loop, so the write never races with add()
+        self._dirty = False
+        return [{'title': e.title, 'mp3_url': e.source} for e in self._entries.values() if e.kind == 'myinstants']
+
+    def save(self):
+        """
+        Writes the myinstants sounds to `path` if anything changed since the
+        last save. Blocking.
+        """
+        if self.path and self._dirty:
+            self._write(self._snapshot())
+
+    def _write(self, sounds):
+        # The write goes through a temporary file so a crash never leaves a truncated index
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'sounds': sounds}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            self._dirty = True
+            logging.warning(f"Could not save the sound index to {self.path}: {e}")
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._flush())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+        self.save()
+
+    async def _flush(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.save_interval)
+            if self.path and self._dirty:
+                await loop.run_in_executor(None, self._write, self._snapshot())
+
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'special': len(self._specials),
+            'trigrams': len(self._grams),
+            'searches': self.searches,
+            'avg_search_ms': (self.total_search / self.searches * 1000) if self.searches else 0.0,
+        }
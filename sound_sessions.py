@@ -0,0 +1,159 @@
+# sound_sessions.py
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+
+
+class SoundSession:
+    """
+    The sounds offered by one /searchsound message.
+    """
+
+    def __init__(self, unique_id, owner_id, sounds, ttl):
+        self.unique_id = unique_id
+        self.owner_id = owner_id
+        self.sounds = sounds  # list of {'title', 'path', 'mp3_url', 'unique_id'}
+        self.message_id = None
+        self.created_at = time.monotonic()
+        self.expires_at = self.created_at + ttl
+        self.bytes = 0
+
+
+class SoundSessionRegistry:
+    """
+    Tracks live sound sessions, indexed by unique id and by message id so
+    lookups and cleanup are O(1).
+
+    Sessions are released when their message goes away, when their TTL runs
+    out (swept by a background task), or oldest-first when the session or
+    disk budget is exceeded. `on_release` is called once per released session.
+    """
+
+    def __init__(self, on_release, ttl=240, max_sessions=500, max_bytes=200 * 1024 * 1024, sweep_interval=30):
+        self.on_release = on_release
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self._sessions = OrderedDict()  # unique_id -> SoundSession, least recently used first
+        self._by_message = {}  # message_id -> unique_id
+        self._total_bytes = 0
+        self._task = None
+        self.created = 0
+        self.closed = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def create(self, unique_id, owner_id, sounds):
+        session = SoundSession(unique_id, owner_id, sounds, self.ttl)
+        self._sessions[unique_id] = session
+        self.created += 1
+        self.update(session)
+        return session
+
+    def get(self, unique_id):
+        """
+        Returns the session and pushes its expiry forward, the same way a
+        discord.py view's timeout restarts on every interaction.
+        """
+        session = self._sessions.get(unique_id)
+        if session is not None:
+            session.expires_at = time.monotonic() + self.ttl
+            self._sessions.move_to_end(unique_id)
+        return session
+
+    def by_message(self, message_id):
+        unique_id = self._by_message.get(message_id)
+        return self._sessions.get(unique_id) if unique_id else None
+
+    def bind_message(self, session, message_id):
+        session.message_id = message_id
+        self._by_message[message_id] = session.unique_id
+
+    def update(self, session):
+        """
+        Recounts the disk space a session holds after its sounds changed and
+        enforces the budgets.
+        """
+        size = 0
+        for sound in session.sounds:
+            if sound.get('path'):
+                try:
+                    size += os.path.getsize(sound['path'])
+                except OSError:
+                    pass
+        self._total_bytes += size - session.bytes
+        session.bytes = size
+        self._enforce_budget(keep=session.unique_id)
+
+    def remove(self, unique_id):
+        session = self._sessions.pop(unique_id, None)
+        if session is None:
+            return None
+        self._by_message.pop(session.message_id, None)
+        self._total_bytes -= session.bytes
+        try:
+            self.on_release(session)
+        except Exception as e:
+            logging.error(f"Error releasing sound session {unique_id}: {e}")
+        return session
+
+    def remove_by_message(self, message_id):
+        unique_id = self._by_message.get(message_id)
+        if unique_id is None:
+            return None
+        self.closed += 1
+        return self.remove(unique_id)
+
+    def _enforce_budget(self, keep=None):
+        for unique_id in list(self._sessions):
+            over_sessions = self.max_sessions and len(self._sessions) > self.max_sessions
+            over_bytes = self.max_bytes and self._total_bytes > self.max_bytes
+            if not (over_sessions or over_bytes):
+                break
+            if unique_id == keep:
+                continue
+            self.evicted += 1
+            logging.info(f"Evicting sound session {unique_id} to stay within budget")
+            self.remove(unique_id)
+
+    def expire(self):
+        # Sessions share one TTL and are moved to the back whenever they are
+        # used, so the expired ones are always at the front.
+        now = time.monotonic()
+        count = 0
+        while self._sessions:
+            unique_id, session = next(iter(self._sessions.items()))
+            if session.expires_at > now:
+                break
+            self.expired += 1
+            self.remove(unique_id)
+            count += 1
+        return count
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._sweep())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+
+    async def _sweep(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            count = self.expire()
+            if count:
+                logging.info(f"Expired {count} abandoned sound session(s)")
+
+    def stats(self):
+        return {
+            'active': len(self._sessions),
+            'bytes': self._total_bytes,
+            'created': self.created,
+            'closed': self.closed,
+            'expired': self.expired,
+            'evicted': self.evicted,
+        }
@@ -0,0 +1,85 @@
+# special_sounds.py
+import asyncio
+import io
+import logging
+
+import discord
+from discord.oggparse import OggStream
+
+from opus_transcode import encode_opus
+
+
+async def encode_opus_frames(path):
+    """
+    Runs FFmpeg once over `path` and returns the encoded 20ms Opus packets.
+    """
+    ogg_data = await encode_opus(path)
+    # The Ogg container carries two header packets before the audio; skip them.
+    return [
+        packet for packet in OggStream(io.BytesIO(ogg_data)).iter_packets()
+        if not packet.startswith((b'OpusHead', b'OpusTags'))
+    ]
+
+
+class OpusFramesSource(discord.AudioSource):
+    """
+    Streams pre-encoded Opus packets from memory, without spawning FFmpeg.
+    """
+
+    def __init__(self, frames):
+        self._frames = iter(frames)
+
+    def read(self):
+        return next(self._frames, b'')
+
+    def is_opus(self):
+        return True
+
+
+class SpecialSoundCache:
+    """
+    Holds the bundled special clips as Opus frames in memory. Each clip is
+    encoded on first use (or up front via warm()) and reused for every play.
+    """
+
+    def __init__(self, files):
+        self.files = files  # name -> path
+        self._frames = {}
+        self._loading = {}
+
+    def __contains__(self, name):
+        return name in self.files
+
+    async def frames(self, name):
+        if name in self._frames:
+            return self._frames[name]
+        # Concurrent first plays of the same clip share one FFmpeg run.
+        task = self._loading.get(name)
+        if task is None:
+            task = asyncio.ensure_future(encode_opus_frames(self.files[name]))
+            self._loading[name] = task
+        try:
+            frames = await task
+        finally:
+            self._loading.pop(name, None)
+        self._frames[name] = frames
+        return frames
+
+    async def source(self, name):
+        """
+        Returns an AudioSource for the clip, falling back to a regular FFmpeg
+        source if the clip could not be pre-encoded.
+        """
+        try:
+            return OpusFramesSource(await self.frames(name))
+        except Exception as e:
+            logging.error(f"Could not pre-encode special sound '{name}': {e}")
+            return discord.FFmpegPCMAudio(self.files[name])
+
+    async def warm(self):
+        for name in self.files:
+            try:
+                await self.frames(name)
+            except Exception as e:
+                logging.error(f"Could not pre-encode special sound '{name}': {e}")
+        logging.info(f"Pre-encoded {len(self._frames)} special sounds into memory.")
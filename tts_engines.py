@@ -0,0 +1,109 @@
+# tts_engines.py
+import abc
+import importlib.util
+import io
+import shutil
+import subprocess
+
+from disk_cache import make_key
+
+
+class TTSEngine(abc.ABC):
+    """
+    A text-to-speech backend. synthesize() is blocking and returns encoded
+    audio bytes (any format FFmpeg can read from a pipe).
+    """
+
+    name = None
+
+    def available(self):
+        return True
+
+    def cache_key(self, text, lang):
+        return make_key(self.name, text, lang)
+
+    @abc.abstractmethod
+    def synthesize(self, text, lang):
+        ...
+
+
+class GTTSEngine(TTSEngine):
+    """
+    Google Translate's TTS. Needs a network round trip for every phrase.
+    """
+
+    name = "gtts"
+
+    def __init__(self, slow=False):
+        self.slow = slow
+
+    def available(self):
+        return importlib.util.find_spec('gtts') is not None
+
+    def cache_key(self, text, lang):
+        # Same key layout as before engines existed, so old cache entries still hit
+        return make_key(self.name, text, lang, self.slow)
+
+    def synthesize(self, text, lang):
+        # Imported on first use; gTTS pulls in requests and friends, which slows down startup
+        from gtts import gTTS
+
+        buffer = io.BytesIO()
+        gTTS(text=text, lang=lang, slow=self.slow).write_to_fp(buffer)
+        return buffer.getvalue()
+
+
+class EspeakEngine(TTSEngine):
+    """
+    Offline synthesis with espeak-ng (or espeak) on the local machine.
+    Robotic, but fast and never throttled.
+    """
+
+    name = "espeak"
+
+    def __init__(self, speed=160, timeout=15):
+        self.speed = speed
+        self.timeout = timeout
+        self.binary = shutil.which('espeak-ng') or shutil.which('espeak')
+
+    def available(self):
+        return self.binary is not None
+
+    def cache_key(self, text, lang):
+        return make_key(self.name, text, lang, self.speed)
+
+    def synthesize(self, text, lang):
+        if not self.binary:
+            raise RuntimeError("espeak-ng is not installed")
+        # The text goes in on stdin, so text starting with '-' is never read as an option
+        result = subprocess.run(
+            [self.binary, '-v', lang, '-s', str(self.speed), '--stdout', '--stdin'],
+            input=text.encode('utf-8'),
+            capture_output=True,
+            timeout=self.timeout,
+            check=True,
+        )
+        return result.stdout  # WAV
+
+
+ENGINES = {}
+
+
+def register_engine(engine):
+    ENGINES[engine.name] = engine
+    return engine
+
+
+def get_engine(name):
+    """
+    Returns the engine registered under `name`, or None if there is no such
+    engine or it cannot run on this machine.
+    """
+    engine = ENGINES.get(name)
+    if engine is None or not engine.available():
+        return None
+    return engine
+
+
+register_engine(GTTSEngine())
+register_engine(EspeakEngine())
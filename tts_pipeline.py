@@ -0,0 +1,54 @@
+# tts_pipeline.py
+import re
+
+# Sentence ends, including the Devanagari danda, and clause breaks
+SENTENCE_BREAK = re.compile(r'(?<=[.!?।॥\n])\s+')
+CLAUSE_BREAK = re.compile(r'(?<=[,;:–—])\s+')
+
+
+def _cut(text, limit):
+    """
+    Splits off the longest head of `text` that fits in `limit` characters,
+    cutting at the last clause break, else the last space, else mid-word.
+    Returns (head, rest).
+    """
+    window = text[:limit + 1]
+    clause_breaks = [match.start() for match in CLAUSE_BREAK.finditer(window) if match.start() <= limit]
+    cut = clause_breaks[-1] if clause_breaks else window.rfind(' ')
+    if cut <= 0:
+        # One unbroken word; the two halves become separate chunks, so no space is added
+        return text[:limit], text[limit:]
+    return text[:cut], text[cut:].lstrip()
+
+
+def split_text(text, max_chars=150, first_max_chars=None):
+    """
+    Splits text into chunks for pipelined synthesis. Chunks end at sentence
+    boundaries, with as many whole sentences per chunk as fit in max_chars;
+    only a sentence too long for a chunk on its own is cut, at a clause break
+    or space. The first chunk can be kept shorter (first_max_chars) so it is
+    synthesized and starts playing sooner.
+    """
+    first_max_chars = min(first_max_chars or max_chars, max_chars)
+    chunks = []
+    current = ""
+
+    def limit():
+        return first_max_chars if not chunks else max_chars
+
+    for sentence in SENTENCE_BREAK.split(text.strip()):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if current and len(current) + 1 + len(sentence) <= limit():
+            current = f"{current} {sentence}"
+            continue
+        if current:
+            chunks.append(current)
+        current = sentence
+        while len(current) > limit():
+            head, current = _cut(current, limit())
+            chunks.append(head)
+    if current:
+        chunks.append(current)
+    return chunks
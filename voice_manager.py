@@ -0,0 +1,193 @@
+# voice_manager.py
+import asyncio
+import logging
+import time
+
+import discord
+
+import metrics
+
+
+class VoiceConnectionManager:
+    """
+    Keeps one warm voice connection per guild.
+
+    ensure() connects or moves as needed and shares a single attempt between
+    concurrent callers. Idle connections are dropped after `idle_timeout`
+    seconds by a background sweep, and connections lost unexpectedly while
+    still in use are re-established in the background. `is_active(guild)`
+    says whether the guild still has something playing or queued; only then
+    is a lost connection worth restoring.
+    """
+
+    def __init__(self, client, idle_timeout=300, connect_timeout=30, sweep_interval=15, is_active=None):
+        self.client = client
+        self.is_active = is_active or (lambda guild: False)
+        self.idle_timeout = idle_timeout
+        self.connect_timeout = connect_timeout
+        self.sweep_interval = sweep_interval
+        self._pending = {}  # guild id -> task for an in-flight connect/move
+        self._last_used = {}  # guild id -> monotonic time of last use
+        self._channels = {}  # guild id -> channel we want to be in
+        self._leaving = set()  # guild ids we are disconnecting on purpose
+        self._task = None
+        self.connects = 0
+        self.moves = 0
+        self.reused = 0
+        self.deduplicated = 0
+        self.reconnects = 0
+        self.idle_disconnects = 0
+        self.failures = 0
+        self.total_connect = 0.0
+        self.max_connect = 0.0
+        self.last_connect = 0.0
+
+    def touch(self, guild):
+        self._last_used[guild.id] = time.monotonic()
+
+    async def ensure(self, channel):
+        """
+        Returns a voice client connected to `channel`, reusing the guild's
+        warm connection when there is one.
+        """
+        guild = channel.guild
+        self.touch(guild)
+        self._channels[guild.id] = channel
+
+        voice_client = guild.voice_client
+        if voice_client and voice_client.is_connected() and voice_client.channel == channel:
+            self.reused += 1
+            return voice_client
+
+        task = self._pending.get(guild.id)
+        if task is not None:
+            self.deduplicated += 1
+        else:
+            task = asyncio.ensure_future(self._connect(channel))
+            self._pending[guild.id] = task
+            task.add_done_callback(lambda _: self._pending.pop(guild.id, None))
+        voice_client = await asyncio.shield(task)
+
+        # Another caller may have asked for a different channel in the meantime
+        if voice_client.channel != channel:
+            return await self.ensure(channel)
+        return voice_client
+
+    async def _connect(self, channel):
+        started = time.perf_counter()
+        voice_client = channel.guild.voice_client
+        try:
+            if voice_client and voice_client.is_connected():
+                await voice_client.move_to(channel)
+                self.moves += 1
+            else:
+                if voice_client:
+                    # A half-open client blocks a fresh connect; drop it first
+                    await voice_client.disconnect(force=True)
+                voice_client = await channel.connect(timeout=self.connect_timeout)
+                self.connects += 1
+        except Exception:
+            self.failures += 1
+            raise
+
+        elapsed = time.perf_counter() - started
+        self.total_connect += elapsed
+        self.last_connect = elapsed
+        self.max_connect = max(self.max_connect, elapsed)
+        metrics.observe_stage('voice_connect', elapsed)
+        logging.info(f"Voice connect to {channel} in guild {channel.guild.id} took {elapsed * 1000:.0f}ms")
+        return voice_client
+
+    def release(self, guild):
+        """
+        Marks the guild's connection as no longer needed. It stays warm until
+        the idle timeout runs out, so a command soon after does not reconnect,
+        but it is not restored if someone disconnects the bot in the meantime.
+        """
+        self._last_used[guild.id] = time.monotonic()
+        self._channels.pop(guild.id, None)
+
+    async def disconnect(self, guild):
+        voice_client = guild.voice_client
+        self._channels.pop(guild.id, None)
+        self._last_used.pop(guild.id, None)
+        if voice_client is None:
+            return False
+        self._leaving.add(guild.id)
+        try:
+            await voice_client.disconnect()
+        finally:
+            self._leaving.discard(guild.id)
+        return True
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._sweep())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+
+    async def _sweep(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            now = time.monotonic()
+            for voice_client in list(self.client.voice_clients):
+                guild = voice_client.guild
+                if voice_client.is_playing():
+                    self.touch(guild)
+                    continue
+                idle_for = now - self._last_used.setdefault(guild.id, now)
+                if idle_for >= self.idle_timeout:
+                    logging.info(f"Leaving voice in guild {guild.id} after {idle_for:.0f}s idle")
+                    self.idle_disconnects += 1
+                    try:
+                        await self.disconnect(guild)
+                    except Exception as e:
+                        logging.error(f"Idle disconnect failed in guild {guild.id}: {e}")
+
+    def on_voice_state_update(self, member, before, after):
+        """
+        Call from the client's on_voice_state_update. Reconnects in the
+        background if the bot was dropped from a channel while it still had
+        something playing or queued there; otherwise the disconnect is
+        treated as deliberate.
+        """
+        if member.id != self.client.user.id or after.channel is not None or before.channel is None:
+            return
+        guild = member.guild
+        if guild.id in self._leaving or guild.id not in self._channels:
+            return
+        if not self.is_active(guild):
+            self._channels.pop(guild.id, None)
+            return
+        asyncio.create_task(self._reconnect(self._channels[guild.id]))
+
+    async def _reconnect(self, channel, attempts=3):
+        for attempt in range(attempts):
+            await asyncio.sleep(2 ** attempt)
+            if self._channels.get(channel.guild.id) != channel or not self.is_active(channel.guild):
+                return
+            try:
+                await self.ensure(channel)
+                self.reconnects += 1
+                logging.info(f"Reconnected to voice in guild {channel.guild.id}")
+                return
+            except (asyncio.TimeoutError, discord.ClientException) as e:
+                logging.warning(f"Voice reconnect attempt {attempt + 1} failed in guild {channel.guild.id}: {e}")
+
+    def stats(self):
+        attempts = self.connects + self.moves
+        return {
+            'connected': len(self.client.voice_clients),
+            'connects': self.connects,
+            'moves': self.moves,
+            'reused': self.reused,
+            'deduplicated': self.deduplicated,
+            'reconnects': self.reconnects,
+            'idle_disconnects': self.idle_disconnects,
+            'failures': self.failures,
+            'avg_connect_ms': (self.total_connect / attempts * 1000) if attempts else 0.0,
+            'max_connect_ms': self.max_connect * 1000,
+            'last_connect_ms': self.last_connect * 1000,
+        }